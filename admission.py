@@ -0,0 +1,325 @@
+# admission.py
+import asyncio
+import math
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from telemetry import JOB_WAIT_SECONDS
+
+# Agent runs executing at once; further jobs wait in the queue
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Jobs allowed to wait; beyond this new requests are rejected with 503
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "32"))
+# Seconds finished jobs stay available at /api/jobs/<id>
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "600"))
+# Queries per client per minute (0 disables), and how many may be sent in a burst
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "30"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "10"))
+# Concurrent model calls per provider, e.g. "ollama=2,openai=16"; Ollama
+# defaults to the parallel slots of its servers (OLLAMA_BASE_URLS)
+LLM_MAX_CONCURRENCY = os.getenv("LLM_MAX_CONCURRENCY", "openai=16")
+DEFAULT_LLM_CONCURRENCY = 4
+
+
+class Overloaded(Exception):
+    """A request was refused; the client should retry after retry_after seconds"""
+
+    status_code = 503
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class QueueFull(Overloaded):
+    status_code = 503
+
+
+class RateLimited(Overloaded):
+    status_code = 429
+
+
+def parse_limits(value):
+    """Parse "provider=limit,provider=limit" settings"""
+    limits = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            name, limit = item.split("=", 1)
+            limits[name.strip()] = int(limit)
+    return limits
+
+
+class RateLimiter:
+    """Token bucket per client"""
+
+    def __init__(self, per_minute=RATE_LIMIT_PER_MINUTE, burst=RATE_LIMIT_BURST):
+        self.rate = per_minute / 60.0
+        self.burst = max(1, burst)
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def check(self, client):
+        """Take a token for client, or raise RateLimited"""
+        if not self.rate:
+            return
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[client] = (tokens, now)
+                self.rejected += 1
+                raise RateLimited("Too many requests", (1 - tokens) / self.rate)
+            self._buckets[client] = (tokens - 1, now)
+            # Forget clients whose bucket has refilled
+            if len(self._buckets) > 10000:
+                full_after = self.burst / self.rate
+                self._buckets = {
+                    key: value for key, value in self._buckets.items() if now - value[1] < full_after
+                }
+
+    def status(self):
+        return {"per_minute": self.rate * 60, "burst": self.burst, "clients": len(self._buckets), "rejected": self.rejected}
+
+
+class LLMConcurrencyLimiter(AsyncCallbackHandler):
+    """Callback handler holding a slot while a chat model call runs.
+
+    The slot is taken in on_chat_model_start, which LangChain awaits before
+    calling the model, and released when the call ends, fails, or its task
+    is cancelled.
+    """
+
+    # Run in the task calling the model, so waiting here delays the call
+    run_inline = True
+
+    def __init__(self, provider, max_concurrent):
+        self.provider = provider
+        self.max_concurrent = max_concurrent
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._held = set()
+        self.waiting = 0
+        self.peak = 0
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self._held.add(run_id)
+        self.peak = max(self.peak, len(self._held))
+        task = asyncio.current_task()
+        if task is not None:
+            task.add_done_callback(lambda _task: self._release(run_id))
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        self._release(run_id)
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        self._release(run_id)
+
+    def _release(self, run_id):
+        if run_id in self._held:
+            self._held.remove(run_id)
+            self._semaphore.release()
+
+    def status(self):
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": len(self._held),
+            "waiting": self.waiting,
+            "peak": self.peak,
+        }
+
+
+class Job:
+    """One agent run submitted to the queue"""
+
+    def __init__(self, client, factory, stream=False):
+        self.id = uuid.uuid4().hex
+        self.client = client
+        self.factory = factory
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.task = None
+        self.done = asyncio.Event()
+        # Set by the queue: takes the job out of it if cancelled while waiting
+        self._dequeue = None
+        # Streaming jobs publish their events here as they are produced
+        self.events = asyncio.Queue() if stream else None
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def cancel(self):
+        if self.finished:
+            return
+        if self.task is not None:
+            self.task.cancel()
+        else:
+            if self._dequeue is not None:
+                self._dequeue()
+            self._finish("cancelled")
+
+    def _finish(self, status, result=None, error=None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        if self.events is not None:
+            self.events.put_nowait(None)
+        self.done.set()
+
+    def info(self):
+        info = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == "done":
+            info["result"] = self.result
+        elif self.error is not None:
+            info["error"] = self.error
+        return info
+
+
+class JobQueue:
+    """Bounded queue of agent runs served by a fixed pool of workers.
+
+    Must be used from the event loop it was started on. Jobs are rejected
+    with QueueFull once max_queued jobs are waiting; the suggested retry
+    delay grows with the queue depth and the average run time.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, max_queued=JOB_QUEUE_SIZE, result_ttl=JOB_RESULT_TTL):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        # Jobs waiting for a worker, oldest first; _ready counts wake-ups
+        self._waiting = deque()
+        self._ready = None
+        self._workers = []
+        self._jobs = {}
+        self._closing = False
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        # Moving average of run time, used to estimate waits
+        self.average_duration = 10.0
+
+    def start(self):
+        self._ready = asyncio.Semaphore(0)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    @property
+    def depth(self):
+        return len(self._waiting)
+
+    def estimated_wait(self, position=None):
+        position = self.depth if position is None else position
+        return self.average_duration * (position // self.workers + 1)
+
+    def submit(self, client, factory, stream=False):
+        """Queue a job running factory(job); raises QueueFull when the queue is at capacity"""
+        self._purge()
+        if self.depth >= self.max_queued:
+            self.rejected += 1
+            raise QueueFull("Server busy: the job queue is full", self.estimated_wait())
+        job = Job(client, factory, stream=stream)
+        self._jobs[job.id] = job
+        job._dequeue = lambda: self._waiting.remove(job)
+        self._waiting.append(job)
+        self._ready.release()
+        return job
+
+    async def run(self, client, factory):
+        """Submit a job and wait for its result; cancelling the wait cancels the job"""
+        job = self.submit(client, factory)
+        try:
+            await job.done.wait()
+        except asyncio.CancelledError:
+            job.cancel()
+            raise
+        if job.status == "failed":
+            raise RuntimeError(job.error)
+        if job.status == "cancelled":
+            raise asyncio.CancelledError()
+        return job.result
+
+    def get(self, job_id):
+        self._purge()
+        return self._jobs.get(job_id)
+
+    def position(self, job):
+        """Number of jobs ahead of job in the queue"""
+        if job.status != "queued" or job not in self._waiting:
+            return 0
+        return self._waiting.index(job)
+
+    async def _worker(self):
+        while True:
+            await self._ready.acquire()
+            if not self._waiting:
+                # The wake-up of a job cancelled while it waited
+                continue
+            job = self._waiting.popleft()
+            job._dequeue = None
+            job.status = "running"
+            job.started_at = time.time()
+            JOB_WAIT_SECONDS.observe(job.started_at - job.created_at)
+            job.task = asyncio.create_task(job.factory(job))
+            self.running += 1
+            try:
+                result = await job.task
+                job._finish("done", result=result)
+            except asyncio.CancelledError:
+                job._finish("cancelled")
+                if self._closing:
+                    raise
+            except Exception as e:
+                job._finish("failed", error=str(e))
+            finally:
+                self.running -= 1
+                self.completed += 1
+                duration = job.finished_at - job.started_at
+                self.average_duration = 0.8 * self.average_duration + 0.2 * duration
+
+    def _purge(self):
+        if not self.result_ttl:
+            return
+        cutoff = time.time() - self.result_ttl
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    async def close(self):
+        self._closing = True
+        for job in list(self._jobs.values()):
+            job.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    def status(self):
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "queued": self.depth,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "average_duration": round(self.average_duration, 3),
+        }
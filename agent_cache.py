@@ -0,0 +1,74 @@
+# agent_cache.py
+import logging
+import os
+from collections import OrderedDict
+
+from telemetry import AGENT_BUILD_SECONDS, timed
+
+logger = logging.getLogger(__name__)
+
+# Compiled agents kept; each tool subset picked by tool selection needs its own
+AGENT_CACHE_SIZE = int(os.getenv("AGENT_CACHE_SIZE", "16"))
+# Opens every prompt, right after the tool schemas. It never changes between
+# requests, so the model server can reuse the cached prefix
+AGENT_SYSTEM_PROMPT = os.getenv(
+    "AGENT_SYSTEM_PROMPT",
+    "You are a helpful assistant with access to file system and database tools. "
+    "Use the tools when a request needs them and answer from their results.",
+)
+
+
+class AgentCache:
+    """Compiled ReAct agents keyed by model configuration, tool-catalog version and tool set.
+
+    A compiled graph keeps no state of its own between invocations, so one
+    instance can serve concurrent queries; it is rebuilt only when the key
+    changes. Session agents share the checkpointer and trim their history
+    with the hook built by history_hook(model). Every prompt starts with
+    the same system_prompt, ahead of the history.
+    """
+
+    def __init__(self, max_size=AGENT_CACHE_SIZE, checkpointer=None, history_hook=None,
+                 system_prompt=AGENT_SYSTEM_PROMPT):
+        self.max_size = max_size
+        self.system_prompt = system_prompt or None
+        self.checkpointer = checkpointer
+        self.history_hook = history_hook
+        self._agents = OrderedDict()
+        self.builds = 0
+        self.hits = 0
+
+    def get(self, model_key, catalog_version, model, tools, session=False):
+        key = (model_key, catalog_version, tuple(tool.name for tool in tools), session)
+        agent = self._agents.get(key)
+        if agent is not None:
+            self._agents.move_to_end(key)
+            self.hits += 1
+            return agent
+
+        logger.info(
+            "Compiling %sagent for model %s, tool catalog v%s, %d tools",
+            "session " if session else "", model_key, catalog_version, len(tools),
+        )
+        # Imported on first build: langgraph.prebuilt is slow to import
+        from langgraph.prebuilt import create_react_agent
+
+        with timed("agent_build", AGENT_BUILD_SECONDS):
+            if session:
+                agent = create_react_agent(
+                    model,
+                    tools,
+                    prompt=self.system_prompt,
+                    checkpointer=self.checkpointer,
+                    pre_model_hook=self.history_hook(model) if self.history_hook else None,
+                )
+            else:
+                agent = create_react_agent(model, tools, prompt=self.system_prompt)
+        self._agents[key] = agent
+        self.builds += 1
+        while len(self._agents) > self.max_size:
+            self._agents.popitem(last=False)
+        return agent
+
+    def clear(self):
+        self._agents.clear()
@@ -0,0 +1,96 @@
+# benchmarks/fake_llm.py
+import asyncio
+import json
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+def scenarios(workspace, table):
+    """Tool calls the fake model makes for each scenario, one list per agent step"""
+    data_file = f"{workspace}/data.txt"
+    return {
+        # One step with two file tools called in parallel
+        "files": [
+            [
+                ("list_files", {"path": workspace}),
+                ("read_file", {"path": data_file, "max_bytes": 4096}),
+            ],
+        ],
+        # A paged SQL select
+        "sql": [
+            [("mysql_select", {"table_name": table, "order_by": "id", "max_rows": 50})],
+        ],
+        # Both servers in the first step, then a follow-up read
+        "mixed": [
+            [
+                ("list_files", {"path": workspace, "pattern": "*.txt"}),
+                ("mysql_query", {"query": f"SELECT COUNT(*) AS n FROM {table}"}),
+            ],
+            [("read_file", {"path": data_file, "start_line": 1, "end_line": 20})],
+        ],
+        # No tools: measures the agent loop alone
+        "answer": [],
+    }
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model replaying a fixed script of tool calls.
+
+    The query names the scenario ("<scenario>: ..."). Each model call looks
+    at how many tool steps the current turn already went through and emits
+    the next one; once the script is done it answers with a summary of the
+    tool results. latency simulates the model's own response time.
+    """
+
+    script: dict
+    latency: float = 0.0
+    tokens_per_char: float = 0.25
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _reply(self, messages):
+        turn_start = max(i for i, msg in enumerate(messages) if isinstance(msg, HumanMessage))
+        turn = messages[turn_start:]
+        scenario = str(turn[0].content).split(":", 1)[0].strip()
+        steps = self.script.get(scenario)
+        if steps is None:
+            raise ValueError(f"Unknown benchmark scenario '{scenario}'")
+        done = sum(1 for msg in turn if isinstance(msg, AIMessage) and msg.tool_calls)
+        if done < len(steps):
+            return AIMessage(content="", tool_calls=[
+                {"name": name, "args": args, "id": f"call-{done}-{index}", "type": "tool_call"}
+                for index, (name, args) in enumerate(steps[done])
+            ])
+        results = [msg for msg in turn if isinstance(msg, ToolMessage)]
+        failed = [msg.name for msg in results if msg.status == "error"]
+        if failed:
+            # Reported as a failed request by the benchmark
+            return AIMessage(content=f"Scenario {scenario} failed: {', '.join(failed)} returned an error")
+        sizes = [len(str(msg.content)) for msg in results]
+        return AIMessage(content=f"Scenario {scenario} done: {len(results)} tool results, {sum(sizes)} characters")
+
+    def _result(self, messages):
+        message = self._reply(messages)
+        prompt_chars = sum(len(str(msg.content)) for msg in messages)
+        output_chars = len(message.content) + len(json.dumps(message.tool_calls))
+        message.usage_metadata = {
+            "input_tokens": int(prompt_chars * self.tokens_per_char),
+            "output_tokens": int(output_chars * self.tokens_per_char),
+            "total_tokens": int((prompt_chars + output_chars) * self.tokens_per_char),
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._result(messages)
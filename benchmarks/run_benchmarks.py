@@ -0,0 +1,297 @@
+# benchmarks/run_benchmarks.py
+"""Offline benchmarks: python -m benchmarks.run_benchmarks
+
+Drives /api/tools and /api/process_query through the Flask app with a
+scripted chat model, against the bundled file and MySQL (SQLite stand-in)
+MCP servers, so results do not depend on a model server or a database.
+Reports latency percentiles and throughput per concurrency level, plus MCP
+subprocess count and memory, and compares them with a baseline run.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+TABLE = "bench_items"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=40, help="requests per target and concurrency level")
+    parser.add_argument("--scenarios", default="files,sql,mixed,answer", help="fake model scripts to run")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds the fake model takes per call")
+    parser.add_argument("--output", help="where to write the results (default: results/<timestamp>.json)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative p95 increase reported as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0,
+                        help="smallest p95 increase reported as a regression, whatever its relative size")
+    return parser.parse_args(argv)
+
+
+def prepare_workspace(path):
+    """Files and a SQLite database the scripted tool calls work on"""
+    with open(os.path.join(path, "data.txt"), "w") as file:
+        for line in range(1, 2001):
+            file.write(f"line {line}: lorem ipsum dolor sit amet {line * 7 % 1000}\n")
+    for index in range(20):
+        with open(os.path.join(path, f"note_{index:02d}.txt"), "w") as file:
+            file.write(f"note {index}\n")
+    database = os.path.join(path, "bench.sqlite3")
+    with sqlite3.connect(database) as conn:
+        conn.execute(f"CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY, name TEXT, value REAL)")
+        conn.executemany(
+            f"INSERT INTO {TABLE} (id, name, value) VALUES (?, ?, ?)",
+            [(i, f"item {i}", i * 1.5) for i in range(1, 501)],
+        )
+    return database
+
+
+def configure_environment(workspace, database):
+    """Isolate the app from local state; explicit environment settings win"""
+    os.environ.setdefault("SERVER_REGISTRY_PATH", os.path.join(workspace, "servers.sqlite3"))
+    os.environ.setdefault("MYSQL_URL", f"sqlite:///{database}")
+    os.environ.setdefault("SESSION_STORE", "memory")
+    os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+    os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "0")
+    os.environ.setdefault("JOB_QUEUE_SIZE", "1000")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def child_processes(pid):
+    """Pids of the descendants of pid, from /proc (empty where /proc is missing)"""
+    children = {}
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as file:
+                stat = file.read()
+        except OSError:
+            continue
+        # The command name may contain spaces; fields resume after its ')'
+        parent = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(parent, []).append(int(entry))
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/status") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def resources():
+    pid = os.getpid()
+    children = child_processes(pid)
+    return {
+        "subprocesses": len(children),
+        "rss_mb": round(rss_bytes(pid) / 2**20, 1),
+        "children_rss_mb": round(sum(rss_bytes(child) for child in children) / 2**20, 1),
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def run_level(app, target, request_fn, concurrency, requests):
+    """Send requests through concurrency threads; return latency and throughput figures"""
+    def one(index):
+        client = app.test_client()
+        started = time.perf_counter()
+        try:
+            ok = request_fn(client, index)
+        except Exception:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency * 1000 for latency, ok in outcomes if ok]
+    result = {
+        "target": target,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": sum(1 for _, ok in outcomes if not ok),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+    }
+    if latencies:
+        result.update({
+            "mean_ms": round(sum(latencies) / len(latencies), 2),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "max_ms": round(max(latencies), 2),
+        })
+    result.update(resources())
+    return result
+
+
+def get_tools(client, index):
+    response = client.get("/api/tools")
+    return response.status_code == 200 and bool(response.get_json())
+
+
+def query_request(scenario):
+    def send(client, index):
+        response = client.post("/api/process_query", json={"query": f"{scenario}: request {index}"})
+        answer = (response.get_json() or {}).get("final_answer") or ""
+        return response.status_code == 200 and answer.startswith(f"Scenario {scenario} done")
+    return send
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARK_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Print the change of each result against the baseline; return the regressions"""
+    previous = {(item["target"], item["concurrency"]): item for item in baseline["results"]}
+    regressions = []
+    print(f"\nCompared with baseline {baseline['meta'].get('revision')} ({baseline['meta']['timestamp']}):")
+    for item in results:
+        before = previous.get((item["target"], item["concurrency"]))
+        if before is None or "p95_ms" not in item or "p95_ms" not in before:
+            continue
+        p95_change = item["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        rps_change = item["throughput_rps"] / before["throughput_rps"] - 1 if before["throughput_rps"] else 0.0
+        # Throughput of short runs is too noisy to gate on; it is only reported
+        regressed = p95_change > threshold and item["p95_ms"] - before["p95_ms"] > min_delta_ms
+        if regressed:
+            regressions.append(item)
+        print(
+            f"  {item['target']:<14} c={item['concurrency']:<3} p95 {before['p95_ms']:>9.1f} -> {item['p95_ms']:>9.1f} ms "
+            f"({p95_change:+.0%})  rps {before['throughput_rps']:>7.1f} -> {item['throughput_rps']:>7.1f} "
+            f"({rps_change:+.0%}){'  REGRESSION' if regressed else ''}"
+        )
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    scenario_names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+
+    workspace = tempfile.mkdtemp(prefix="mcp-client-bench-")
+    database = prepare_workspace(workspace)
+    configure_environment(workspace, database)
+
+    # Imported only now, so the settings above are in place
+    started = time.perf_counter()
+    import flask_app
+    from benchmarks.fake_llm import ScriptedChatModel, scenarios
+    import_seconds = time.perf_counter() - started
+
+    script = scenarios(workspace, TABLE)
+    unknown = set(scenario_names) - set(script)
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    model = ScriptedChatModel(script=script, latency=args.llm_latency)
+    flask_app.get_llm_model = lambda: model
+
+    app = flask_app.app
+    try:
+        # Cold start: the first listing spawns every MCP server
+        started = time.perf_counter()
+        cold_ok = get_tools(app.test_client(), 0)
+        cold_start = {
+            "import_s": round(import_seconds, 3),
+            "first_tools_s": round(time.perf_counter() - started, 3),
+            "ok": cold_ok,
+            **resources(),
+        }
+        print(f"Cold start: {cold_start}")
+
+        targets = [("tools", get_tools)] + [(f"query:{name}", query_request(name)) for name in scenario_names]
+        results = []
+        for target, request_fn in targets:
+            # Warm up the agent and fill the session pools before measuring
+            run_level(app, target, request_fn, max(levels), max(levels))
+            for concurrency in levels:
+                result = run_level(app, target, request_fn, concurrency, args.requests)
+                results.append(result)
+                print(
+                    f"{target:<14} c={concurrency:<3} p50 {result.get('p50_ms', 0):>8.1f} ms  "
+                    f"p95 {result.get('p95_ms', 0):>8.1f} ms  p99 {result.get('p99_ms', 0):>8.1f} ms  "
+                    f"{result['throughput_rps']:>7.1f} req/s  errors {result['errors']}  "
+                    f"subprocesses {result['subprocesses']}  rss {result['rss_mb']}+{result['children_rss_mb']} MB"
+                )
+    finally:
+        flask_app.event_loop.shutdown()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "requests": args.requests,
+            "llm_latency": args.llm_latency,
+        },
+        "cold_start": cold_start,
+        "results": results,
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {output}")
+
+    regressions = []
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.threshold, args.min_delta_ms)
+
+    errors = sum(result["errors"] for result in results)
+    if errors or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# circuit_breaker.py
+import logging
+import os
+import time
+
+from telemetry import CIRCUIT_OPENED
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failures (timeouts, crashes, failed spawns) that open a server's circuit
+BREAKER_FAILURES = int(os.getenv("MCP_BREAKER_FAILURES", "3"))
+# Seconds an open circuit fails calls at once before letting a trial call through
+BREAKER_RESET_AFTER = float(os.getenv("MCP_BREAKER_RESET_AFTER", "30"))
+
+
+class CircuitOpen(Exception):
+    """A call was refused without reaching the server, whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Failure counter of one MCP server.
+
+    Closed, calls go through. After failure_threshold failures in a row the
+    circuit opens and calls fail at once for reset_after seconds; then it is
+    half-open and a single trial call decides whether it closes again or
+    stays open for another period.
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURES, reset_after=BREAKER_RESET_AFTER):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_after = reset_after
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self._trial = False
+
+    @property
+    def retry_due(self):
+        return self.state == "open" and time.monotonic() - self.opened_at >= self.reset_after
+
+    @property
+    def available(self):
+        """Whether calls may currently reach the server (including a due trial)"""
+        return self.state == "closed" or self.retry_due
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may go through now"""
+        if self.state == "closed":
+            return
+        if self.retry_due:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._trial:
+            self._trial = True
+            logger.info("MCP server '%s': trying a call after the circuit opened", self.name)
+            return
+        retry_in = self.reset_after - (time.monotonic() - self.opened_at) if self.opened_at else self.reset_after
+        raise CircuitOpen(
+            f"MCP server '{self.name}' is unavailable after repeated failures "
+            f"(last: {self.last_error}); retrying in {max(0, retry_in):.0f}s"
+        )
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info("MCP server '%s' recovered, circuit closed", self.name)
+        self.state = "closed"
+        self.failures = 0
+        self._trial = False
+
+    def record_failure(self, error):
+        self.failures += 1
+        self.last_error = str(error) or error.__class__.__name__
+        self._trial = False
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            if self.state == "closed":
+                CIRCUIT_OPENED.labels(server=self.name).inc()
+                logger.warning("MCP server '%s' failed %d times in a row, circuit opened: %s",
+                               self.name, self.failures, self.last_error)
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """End a call that neither succeeded nor failed (e.g. cancelled by the client)"""
+        self._trial = False
+
+    def status(self):
+        return {
+            "state": "half_open" if self.retry_due else self.state,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,131 @@
+# conversation.py
+import logging
+import os
+import re
+import uuid
+
+from langchain_core.messages import HumanMessage, RemoveMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+logger = logging.getLogger(__name__)
+
+# "memory" keeps sessions until restart, "sqlite" persists them to SESSION_DB_PATH
+SESSION_STORE = os.getenv("SESSION_STORE", "memory").lower()
+SESSION_DB_PATH = os.getenv(
+    "SESSION_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.sqlite3"),
+)
+# Approximate tokens of history sent to the model; older turns are summarized
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "4000"))
+# Share of the budget kept verbatim when the history is summarized
+SESSION_KEEP_RATIO = 0.5
+SUMMARY_ID = "conversation-summary"
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below so it can replace it in the assistant's memory. "
+    "Keep every fact the user gave, the questions asked and the answers given, and the "
+    "key data returned by tools (names, ids, numbers, file paths, query results) so they "
+    "do not have to be fetched again. Be concise."
+)
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def valid_session_id(session_id):
+    return isinstance(session_id, str) and bool(SESSION_ID_PATTERN.match(session_id))
+
+
+async def create_checkpointer(store=SESSION_STORE, path=SESSION_DB_PATH):
+    """Create the LangGraph checkpointer holding session state; call it on the event loop"""
+    if store == "sqlite":
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        checkpointer = AsyncSqliteSaver(await aiosqlite.connect(path))
+        await checkpointer.setup()
+        return checkpointer
+    if store == "memory":
+        from langgraph.checkpoint.memory import InMemorySaver
+        return InMemorySaver()
+    raise ValueError(f"Unsupported SESSION_STORE: {store}")
+
+
+async def close_checkpointer(checkpointer):
+    conn = getattr(checkpointer, "conn", None)
+    if conn is not None:
+        await conn.close()
+
+
+async def load_history(checkpointer, session_id):
+    """Messages stored for a session, or None if it does not exist"""
+    checkpoint = await checkpointer.aget_tuple({"configurable": {"thread_id": session_id}})
+    if checkpoint is None:
+        return None
+    return checkpoint.checkpoint["channel_values"].get("messages", [])
+
+
+def _render(messages):
+    lines = []
+    for msg in messages:
+        content = msg.content if isinstance(msg.content, str) else str(msg.content)
+        if msg.type == "ai" and getattr(msg, "tool_calls", None):
+            calls = ", ".join(f"{call['name']}({call['args']})" for call in msg.tool_calls)
+            content = f"{content}\n[called {calls}]".strip()
+        label = "summary" if msg.id == SUMMARY_ID else msg.type
+        lines.append(f"{label}: {content}")
+    return "\n\n".join(lines)
+
+
+class ConversationHistory:
+    """pre_model_hook keeping a session's history within a token budget.
+
+    While the history fits, it is sent unchanged. Past the budget, the
+    oldest turns are replaced in the checkpoint by a summary written by the
+    model, and the most recent turns are kept verbatim. Cuts only happen at
+    user messages, so tool calls always stay next to their results.
+    """
+
+    def __init__(self, model, token_budget=SESSION_TOKEN_BUDGET):
+        self.model = model
+        self.token_budget = token_budget
+        self.summaries = 0
+
+    def _keep_from(self, messages):
+        """Index of the earliest user message whose tail fits the kept share of the budget"""
+        human = [i for i, msg in enumerate(messages) if isinstance(msg, HumanMessage)]
+        if not human:
+            return 0
+        keep_budget = self.token_budget * SESSION_KEEP_RATIO
+        for index in human:
+            if count_tokens_approximately(messages[index:]) <= keep_budget:
+                return index
+        # Even the current turn alone is over budget: keep it whole
+        return human[-1]
+
+    async def __call__(self, state):
+        messages = state["messages"]
+        if not self.token_budget or count_tokens_approximately(messages) <= self.token_budget:
+            return {"llm_input_messages": messages}
+
+        keep_from = self._keep_from(messages)
+        older = messages[:keep_from]
+        if not older or (len(older) == 1 and older[0].id == SUMMARY_ID):
+            return {"llm_input_messages": messages}
+
+        logger.info("Summarizing %d messages of conversation history", len(older))
+        response = await self.model.ainvoke([
+            SystemMessage(content=SUMMARY_PROMPT),
+            HumanMessage(content=_render(older)),
+        ])
+        self.summaries += 1
+        summary = SystemMessage(
+            content=f"Summary of the earlier conversation:\n{response.content}",
+            id=SUMMARY_ID,
+        )
+        kept = [summary, *messages[keep_from:]]
+        # Rewrite the stored history: the summary replaces the older turns.
+        # llm_input_messages is checkpointed too, so it must be set as well
+        return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *kept], "llm_input_messages": kept}
@@ -0,0 +1,187 @@
+# event_loop.py
+import asyncio
+import concurrent.futures
+import logging
+import queue
+import select
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# How often a waiting request thread checks whether its client went away
+POLL_INTERVAL = 0.25
+
+
+class RequestTimeout(Exception):
+    """The coroutine did not finish before the request deadline"""
+
+
+class ClientDisconnected(Exception):
+    """The HTTP client closed the connection before the result was ready"""
+
+
+def client_disconnected(environ):
+    """Best-effort check whether the client of a WSGI request has hung up"""
+    sock = environ.get("werkzeug.socket") or environ.get("gunicorn.socket")
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        # A readable socket with nothing to read means the peer closed it
+        return sock.recv(1, socket.MSG_PEEK) == b""
+    except ValueError:
+        # TLS sockets do not support MSG_PEEK; assume the client is still there
+        return False
+    except OSError:
+        return True
+
+
+class _Failure:
+    """Carries an exception raised on the loop back to the consuming thread"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class BackgroundEventLoop:
+    """A single asyncio loop running in a daemon thread.
+
+    Request threads submit coroutines to it, so async resources (MCP
+    sessions, HTTP clients) created on the loop can be shared between them.
+    """
+
+    def __init__(self, name="mcp-event-loop"):
+        self.name = name
+        self.loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._shutdown_hooks = []
+
+    def start(self):
+        """Start the loop thread if it is not running yet"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self.loop
+            self.loop = asyncio.new_event_loop()
+            started = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, args=(started,), name=self.name, daemon=True
+            )
+            self._thread.start()
+            started.wait()
+            return self.loop
+
+    def _run(self, started):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(started.set)
+        self.loop.run_forever()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def call_soon(self, callback, *args):
+        """Schedule a plain callback on the loop thread"""
+        self.start()
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def submit(self, coroutine):
+        """Schedule a coroutine on the loop and return a concurrent Future"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine, timeout=None, environ=None):
+        """Run a coroutine on the loop and block the calling thread for its result.
+
+        The coroutine is cancelled if it outlives timeout (RequestTimeout) or
+        if the WSGI client behind environ disconnects (ClientDisconnected).
+        """
+        future = self.submit(coroutine)
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            wait = POLL_INTERVAL if environ is not None else None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    future.cancel()
+                    raise RequestTimeout(f"Request did not complete within {timeout} seconds")
+                wait = remaining if wait is None else min(wait, remaining)
+            try:
+                return future.result(timeout=wait)
+            except concurrent.futures.TimeoutError:
+                if environ is not None and client_disconnected(environ):
+                    future.cancel()
+                    raise ClientDisconnected("Client disconnected before the request completed")
+
+    def iterate(self, async_iterable, timeout=None):
+        """Consume an async iterable on the loop and yield its items in the calling thread.
+
+        Closing the returned generator (e.g. when a streaming client goes away)
+        cancels the consumer on the loop. RequestTimeout is raised if the whole
+        iteration outlives timeout.
+        """
+        items = queue.Queue()
+        finished = object()
+
+        async def pump():
+            try:
+                async for item in async_iterable:
+                    items.put(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                items.put(_Failure(e))
+            finally:
+                aclose = getattr(async_iterable, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+                items.put(finished)
+
+        future = self.submit(pump())
+        deadline = time.monotonic() + timeout if timeout else None
+        try:
+            while True:
+                wait = None if deadline is None else max(deadline - time.monotonic(), 0)
+                try:
+                    item = items.get(timeout=wait)
+                except queue.Empty:
+                    raise RequestTimeout(f"Request did not complete within {timeout} seconds")
+                if item is finished:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            future.cancel()
+
+    def add_shutdown_hook(self, coroutine_fn):
+        """Register a coroutine function awaited on the loop before it stops"""
+        self._shutdown_hooks.append(coroutine_fn)
+
+    def shutdown(self, timeout=10):
+        """Run the shutdown hooks, cancel leftover tasks and stop the thread"""
+        if not self.running:
+            return
+
+        async def drain():
+            for hook in reversed(self._shutdown_hooks):
+                try:
+                    await hook()
+                except Exception as e:
+                    logger.error("Error in shutdown hook %s: %s", hook.__qualname__, e)
+            current = asyncio.current_task()
+            pending = [task for task in asyncio.all_tasks() if task is not current]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        try:
+            self.submit(drain()).result(timeout=timeout)
+        except Exception as e:
+            logger.error("Error shutting down event loop: %s", e)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=timeout)
@@ -1,22 +1,431 @@
 # math_server.py
+import base64
+import fnmatch
+import json
+import mmap
 import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from mcp.server.fastmcp import FastMCP
+from mcp_server_runner import run_server
 from datetime import datetime
-mcp = FastMCP("Math")
+mcp = FastMCP("Math", log_level=os.getenv("LOG_LEVEL", "INFO").upper())
+
+# Largest amount of text a single read returns, so large files cannot flood
+# the model's context or the stdio pipe
+READ_MAX_BYTES = int(os.getenv("FILE_READ_MAX_BYTES", str(256 * 1024)))
+# Files at least this large are memory-mapped instead of read into memory
+MMAP_THRESHOLD = int(os.getenv("FILE_MMAP_THRESHOLD", str(4 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+LIST_LIMIT = 200
+SEARCH_MAX_RESULTS = 100
+# Files larger than this are skipped by search_files
+SEARCH_MAX_FILE_BYTES = int(os.getenv("FILE_SEARCH_MAX_FILE_BYTES", str(10 * 1024 * 1024)))
+# Most paths a single read_files/write_files call takes
+BATCH_MAX_FILES = int(os.getenv("FILE_BATCH_MAX_FILES", "50"))
+# Threads reading the files of one read_files call
+BATCH_READ_WORKERS = int(os.getenv("FILE_BATCH_READ_WORKERS", "8"))
+
+# New files get the permissions open() would give them; os.umask can only be
+# read by setting it, so do it once before any thread starts
+UMASK = os.umask(0o022)
+os.umask(UMASK)
+
+
+def _char_boundary(data, end):
+    """Move end back so it does not split a UTF-8 sequence"""
+    if end >= len(data):
+        return len(data)
+    start = end
+    while end > 0 and (data[end] & 0xC0) == 0x80:
+        end -= 1
+    if end == 0:
+        # Range smaller than one character: include the whole character
+        end = start
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end += 1
+    return end
+
+
+class _FileView:
+    """Byte access to a file, memory-mapped when it is large"""
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.map = None
+        if self.size >= MMAP_THRESHOLD:
+            # Pages are loaded on demand, so only the range read costs memory
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.buffer = self.map
+        else:
+            self.buffer = self.file.read()
+
+    def read(self, offset, length):
+        return self.buffer[offset:offset + length]
+
+    def find(self, sub, start):
+        return self.buffer.find(sub, start)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+
+def _read_bytes(view, offset, length, max_bytes):
+    """Read a byte range, returning (text, end offset, truncated)"""
+    offset = max(0, min(offset, view.size))
+    wanted = view.size - offset if length is None else max(0, min(length, view.size - offset))
+    take = min(wanted, max_bytes)
+    if offset + take < view.size:
+        # Read a few extra bytes so the range can end on a character boundary
+        data = view.read(offset, take + 4)
+        end = _char_boundary(data, take)
+    else:
+        data = view.read(offset, take)
+        end = len(data)
+    return data[:end].decode("utf-8", errors="replace"), offset + end, take < wanted
+
+
+def _read_lines(view, start_line, end_line, max_bytes):
+    """Read a 1-based inclusive line range.
+
+    Returns (text, last line read, truncated, byte offset where reading stopped).
+    """
+    start_line = max(1, start_line or 1)
+    # Skip to the first requested line without loading what comes before it
+    position = 0
+    line = 1
+    while line < start_line and position < view.size:
+        newline = view.find(b"\n", position)
+        if newline == -1:
+            position = view.size
+            break
+        position = newline + 1
+        line += 1
+
+    chunks = []
+    used = 0
+    last_line = line - 1
+    while position < view.size and (end_line is None or line <= end_line):
+        newline = view.find(b"\n", position)
+        stop = view.size if newline == -1 else newline + 1
+        if used + (stop - position) > max_bytes:
+            return b"".join(chunks).decode("utf-8", errors="replace"), last_line, True, position
+        chunks.append(view.read(position, stop - position))
+        used += stop - position
+        last_line = line
+        position = stop
+        line += 1
+    return b"".join(chunks).decode("utf-8", errors="replace"), last_line, False, position
+
 
 #file system tool
 @mcp.tool()
-def read_file(path: str) -> str:
-    """Read a file"""
-    with open(path, "r") as file:
-        return file.read()
+def read_file(
+    path: str,
+    offset: int = 0,
+    length: int | None = None,
+    start_line: int | None = None,
+    end_line: int | None = None,
+    max_bytes: int = READ_MAX_BYTES,
+) -> str:
+    """Read a file, or part of it.
 
-#write file tool
+    Use offset/length for a byte range, or start_line/end_line (1-based,
+    inclusive) for a line range. At most max_bytes are returned; truncated
+    output ends with a note telling where to continue from.
+    """
+    max_bytes = max(1, min(max_bytes, READ_MAX_BYTES))
+    with _FileView(path) as view:
+        if start_line is not None or end_line is not None:
+            text, last_line, truncated, position = _read_lines(view, start_line, end_line, max_bytes)
+            if truncated and not text:
+                # A single line longer than max_bytes: fall back to a byte range
+                text, end, _ = _read_bytes(view, position, None, max_bytes)
+                text += (
+                    f"\n[truncated: line {last_line + 1} is longer than {max_bytes} bytes; "
+                    f"call read_file with offset={end} to continue]"
+                )
+            elif truncated:
+                text += (
+                    f"\n[truncated: returned up to line {last_line} ({max_bytes} bytes max); "
+                    f"call read_file with start_line={last_line + 1} to continue]"
+                )
+            return text
+
+        text, end, truncated = _read_bytes(view, offset, length, max_bytes)
+        if truncated:
+            text += (
+                f"\n[truncated: returned bytes {max(0, offset)}-{end} of {view.size}; "
+                f"call read_file with offset={end} to continue]"
+            )
+        return text
+
+
+def _encode_cursor(offset, mtime_ns):
+    return base64.urlsafe_b64encode(f"{offset}:{mtime_ns}".encode()).decode()
+
+
+def _decode_cursor(cursor):
+    offset, mtime_ns = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+    return int(offset), int(mtime_ns)
+
+
+#chunked file reading tool
 @mcp.tool()
-def write_file(path: str, content: str) -> str:
-    """Write to a file"""
-    with open(path, "w") as file:
+def read_file_chunk(path: str, cursor: str = "", chunk_size: int = CHUNK_SIZE) -> str:
+    """Read a file one chunk at a time.
+
+    Start with an empty cursor and pass back next_cursor to get the following
+    chunk; next_cursor is null once the end of the file is reached. Returns JSON.
+    """
+    chunk_size = max(1, min(chunk_size, READ_MAX_BYTES))
+    mtime_ns = os.stat(path).st_mtime_ns
+    offset = 0
+    if cursor:
+        offset, cursor_mtime_ns = _decode_cursor(cursor)
+        if cursor_mtime_ns != mtime_ns:
+            return json.dumps({"path": path, "error": "File changed since the cursor was issued; start again with an empty cursor"})
+
+    with _FileView(path) as view:
+        text, end, _ = _read_bytes(view, offset, chunk_size, chunk_size)
+        return json.dumps({
+            "path": path,
+            "offset": offset,
+            "size": view.size,
+            "content": text,
+            "next_cursor": _encode_cursor(end, mtime_ns) if end < view.size else None,
+        })
+
+def _read_one(path, max_bytes):
+    """read_files entry for one path; errors are reported, not raised"""
+    try:
+        with _FileView(path) as view:
+            text, end, truncated = _read_bytes(view, 0, None, max_bytes)
+            return {"path": path, "size": view.size, "content": text, "truncated": truncated}
+    except OSError as e:
+        return {"path": path, "error": f"{e.__class__.__name__}: {e.strerror or e}"}
+
+
+#batch file reading tool
+@mcp.tool()
+def read_files(paths: list[str], max_bytes_per_file: int = 64 * 1024) -> str:
+    """Read several files in one call.
+
+    Returns a JSON list with, per path: content, size and truncated, or error
+    when the file could not be read. Each file returns at most
+    max_bytes_per_file bytes, and all of them together at most the server's
+    read limit; use read_file with an offset to continue a truncated file.
+    """
+    if len(paths) > BATCH_MAX_FILES:
+        return json.dumps({"error": f"At most {BATCH_MAX_FILES} paths per call, got {len(paths)}"})
+    per_file = max(1, min(max_bytes_per_file, READ_MAX_BYTES))
+    with ThreadPoolExecutor(max_workers=max(1, min(BATCH_READ_WORKERS, len(paths)))) as pool:
+        results = list(pool.map(lambda path: _read_one(path, per_file), paths))
+
+    # Keep the whole answer within the single-read limit, in the order asked
+    remaining = READ_MAX_BYTES
+    for result in results:
+        content = result.get("content")
+        if content is None:
+            continue
+        data = content.encode("utf-8")
+        if len(data) > remaining:
+            end = _char_boundary(data, remaining)
+            result["content"] = data[:end].decode("utf-8", errors="replace")
+            result["truncated"] = True
+            data = data[:end]
+        remaining -= len(data)
+    return json.dumps(results)
+
+
+def _stage(path, content, append=False):
+    """Write content to a temporary file next to path, after the current content of path
+    with append; returns its name"""
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as file:
+            if append and os.path.exists(path):
+                with open(path, "rb") as original:
+                    shutil.copyfileobj(original, file)
+            file.write(content.encode("utf-8"))
+            file.flush()
+            os.fsync(file.fileno())
+        if os.path.exists(path):
+            # Keep the permissions of the file being replaced
+            shutil.copymode(path, temp_path)
+        else:
+            # mkstemp creates the file readable by its owner only
+            os.chmod(temp_path, 0o666 & ~UMASK)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path
+
+
+def _backup(path, temp_path):
+    """Hard link to the current file at path, to put it back later; None if there is none"""
+    if not os.path.exists(path):
+        return None
+    backup_path = f"{temp_path}.bak"
+    try:
+        os.link(path, backup_path)
+    except OSError:
+        # File systems without hard links
+        shutil.copy2(path, backup_path)
+    return backup_path
+
+
+def _append(path, content):
+    with open(path, "a", encoding="utf-8", newline="") as file:
         file.write(content)
+    return os.path.getsize(path)
+
+
+#write file tool
+@mcp.tool()
+def write_file(path: str, content: str, mode: str = "overwrite") -> str:
+    """Write to a file.
+
+    mode "overwrite" replaces the file atomically: readers see either the
+    old or the new content, never a partial write. mode "append" adds
+    content at the end without rewriting the file. To change part of a
+    file, use edit_file instead of rewriting it.
+    """
+    if mode == "append":
+        size = _append(path, content)
+        return f"Appended {len(content)} characters to {path} ({size} bytes)"
+    if mode != "overwrite":
+        return f"Unknown mode '{mode}': use overwrite or append"
+    os.replace(_stage(path, content), path)
+    return f"Wrote {len(content)} characters to {path}"
+
+
+#batch file writing tool
+@mcp.tool()
+def write_files(files: list[dict], all_or_nothing: bool = True) -> str:
+    """Write several files in one call.
+
+    files is a list of {"path", "content", "mode"} objects, mode being
+    "overwrite" (default) or "append". New contents are written to temporary
+    files first and renamed into place once all of them are ready. With
+    all_or_nothing, appends are staged the same way (rewriting the file) and
+    a failure at any step puts back the files already replaced, so the batch
+    is written whole or not at all; without it, each file succeeds or fails
+    on its own and appends are done in place. Returns a JSON list with the
+    outcome of each file.
+    """
+    if len(files) > BATCH_MAX_FILES:
+        return json.dumps({"error": f"At most {BATCH_MAX_FILES} files per call, got {len(files)}"})
+    results = [{"path": item.get("path")} for item in files]
+    staged = []
+    for item, result in zip(files, results):
+        mode = item.get("mode", "overwrite")
+        if not item.get("path") or mode not in ("overwrite", "append"):
+            result["error"] = "Each file needs a path, and mode overwrite or append"
+            continue
+        if mode == "overwrite" or all_or_nothing:
+            try:
+                temp_path = _stage(item["path"], item.get("content", ""), append=mode == "append")
+                staged.append((item, result, temp_path))
+            except OSError as e:
+                result["error"] = f"{e.__class__.__name__}: {e.strerror or e}"
+        else:
+            staged.append((item, result, None))
+
+    if all_or_nothing:
+        return _commit_all(staged, results)
+
+    for item, result, temp_path in staged:
+        content = item.get("content", "")
+        try:
+            if temp_path is not None:
+                os.replace(temp_path, item["path"])
+                result["written"] = len(content)
+            else:
+                result["size"] = _append(item["path"], content)
+                result["appended"] = len(content)
+        except OSError as e:
+            result["error"] = f"{e.__class__.__name__}: {e.strerror or e}"
+    return json.dumps(results)
+
+
+def _commit_all(staged, results):
+    """Rename every staged file into place, or none of them"""
+    committed = []
+    failed = any("error" in result for result in results)
+    pending = list(staged)
+    try:
+        while pending and not failed:
+            item, result, temp_path = pending[0]
+            try:
+                backup_path = _backup(item["path"], temp_path)
+                try:
+                    os.replace(temp_path, item["path"])
+                except OSError:
+                    if backup_path is not None:
+                        os.unlink(backup_path)
+                    raise
+            except OSError as e:
+                result["error"] = f"{e.__class__.__name__}: {e.strerror or e}"
+                failed = True
+                break
+            pending.pop(0)
+            committed.append((item, result, backup_path))
+            key = "appended" if item.get("mode") == "append" else "written"
+            result[key] = len(item.get("content", ""))
+            if key == "appended":
+                result["size"] = os.path.getsize(item["path"])
+    finally:
+        for _, _, temp_path in pending:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+        for item, result, backup_path in reversed(committed):
+            if failed:
+                # Put back the content the file had before the batch
+                if backup_path is not None:
+                    os.replace(backup_path, item["path"])
+                else:
+                    os.unlink(item["path"])
+                result.pop("written", None)
+                result.pop("appended", None)
+                result.pop("size", None)
+            elif backup_path is not None:
+                os.unlink(backup_path)
+    if failed:
+        for result in results:
+            result.setdefault("error", "Not written: another file in the batch failed")
+    return json.dumps(results)
+
+
+#edit file tool
+@mcp.tool()
+def edit_file(path: str, edits: list[dict]) -> str:
+    """Change parts of a file without sending all of it.
+
+    edits is a list of {"old", "new"} objects, applied in order: each old
+    text must appear exactly once in the file and is replaced by new. The
+    file is rewritten atomically, and only if every edit applies.
+    """
+    with open(path, encoding="utf-8", newline="") as file:
+        text = file.read()
+    for number, edit in enumerate(edits, 1):
+        old = edit.get("old", "")
+        count = text.count(old) if old else 0
+        if count != 1:
+            found = "not found" if count == 0 else f"found {count} times"
+            return f"Edit {number} not applied, file unchanged: old text {found}; make it unique"
+        text = text.replace(old, edit.get("new", ""), 1)
+    os.replace(_stage(path, text), path)
+    return f"Applied {len(edits)} edits to {path}"
 
 #make file tool
 @mcp.tool()
@@ -25,12 +434,137 @@ def make_file(path: str) -> str:
     with open(path, "w") as file:
         pass
 
+def _walk(root, recursive, max_depth, include_hidden):
+    """Yield (relative path, DirEntry) in a stable order, streaming directory by directory"""
+    stack = [("", 0)]
+    while stack:
+        relative_dir, depth = stack.pop()
+        try:
+            with os.scandir(os.path.join(root, relative_dir)) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            if not include_hidden and entry.name.startswith("."):
+                continue
+            relative_path = os.path.join(relative_dir, entry.name)
+            yield relative_path, entry
+            if recursive and depth + 1 < max_depth and entry.is_dir(follow_symlinks=False):
+                subdirs.append((relative_path, depth + 1))
+        # Depth-first, keeping alphabetical order
+        stack.extend(reversed(subdirs))
+
+
+def _matches(relative_path, name, pattern, compiled_regex):
+    if pattern and not (fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative_path, pattern)):
+        return False
+    if compiled_regex is not None and not compiled_regex.search(relative_path):
+        return False
+    return True
+
+
+def _format_entry(relative_path, entry):
+    try:
+        info = entry.stat(follow_symlinks=False)
+    except OSError:
+        return f"?  {'-':>10}  {'-':16}  {relative_path}"
+    modified = datetime.fromtimestamp(info.st_mtime).strftime("%Y-%m-%d %H:%M")
+    if entry.is_dir(follow_symlinks=False):
+        return f"d  {'-':>10}  {modified}  {relative_path}/"
+    return f"f  {info.st_size:>10}  {modified}  {relative_path}"
+
+
 #list files in current directory tool
 @mcp.tool()
-def list_files() -> str:
-    """List files in the current directory"""
-    return "\n".join(os.listdir(os.getcwd()))
+def list_files(
+    path: str = ".",
+    recursive: bool = False,
+    max_depth: int = 5,
+    pattern: str = "",
+    regex: str = "",
+    include_hidden: bool = True,
+    limit: int = LIST_LIMIT,
+    cursor: str = "",
+) -> str:
+    """List files in a directory (the current directory by default).
+
+    Each line is: type (f/d), size in bytes, modification time, relative path.
+    Set recursive to walk subdirectories up to max_depth levels. Filter with a
+    glob pattern (e.g. "*.py") and/or a regex on the relative path. At most
+    limit entries are returned; pass back the cursor from the last line to
+    get the next page.
+    """
+    root = os.path.join(os.getcwd(), path)
+    limit = max(1, min(limit, 1000))
+    skip = int(base64.urlsafe_b64decode(cursor.encode()).decode()) if cursor else 0
+    compiled_regex = re.compile(regex) if regex else None
+
+    lines = []
+    matched = 0
+    for relative_path, entry in _walk(root, recursive, max(1, max_depth), include_hidden):
+        if not _matches(relative_path, entry.name, pattern, compiled_regex):
+            continue
+        matched += 1
+        if matched <= skip:
+            continue
+        if len(lines) == limit:
+            # One more match exists: stop walking and hand out a cursor
+            next_cursor = base64.urlsafe_b64encode(str(skip + limit).encode()).decode()
+            lines.append(f"[more entries: call list_files with the same arguments and cursor={next_cursor}]")
+            break
+        lines.append(_format_entry(relative_path, entry))
+    return "\n".join(lines) if lines else "No matching files"
+
+
+#search file contents tool
+@mcp.tool()
+def search_files(
+    query: str,
+    path: str = ".",
+    regex: bool = False,
+    case_sensitive: bool = False,
+    pattern: str = "",
+    max_depth: int = 10,
+    max_results: int = SEARCH_MAX_RESULTS,
+) -> str:
+    """Search file contents, like grep.
+
+    Looks for query (a literal string, or a regular expression when regex is
+    true) in the files under path whose name matches the optional glob
+    pattern. Returns "path:line: text" lines and stops after max_results
+    matches. Binary and very large files are skipped.
+    """
+    root = os.path.join(os.getcwd(), path)
+    max_results = max(1, min(max_results, 1000))
+    flags = 0 if case_sensitive else re.IGNORECASE
+    matcher = re.compile(query if regex else re.escape(query), flags)
+
+    results = []
+    for relative_path, entry in _walk(root, True, max(1, max_depth), False):
+        if not entry.is_file(follow_symlinks=False):
+            continue
+        if pattern and not fnmatch.fnmatch(entry.name, pattern):
+            continue
+        try:
+            if entry.stat().st_size > SEARCH_MAX_FILE_BYTES:
+                continue
+            with open(entry.path, "rb") as file:
+                if b"\0" in file.read(1024):
+                    continue
+                file.seek(0)
+                # Stream line by line so only matching lines are kept in memory
+                for line_number, raw_line in enumerate(file, 1):
+                    line = raw_line.decode("utf-8", errors="replace").rstrip("\n")
+                    if matcher.search(line):
+                        results.append(f"{relative_path}:{line_number}: {line[:200]}")
+                        if len(results) >= max_results:
+                            results.append(f"[stopped after {max_results} matches]")
+                            return "\n".join(results)
+        except OSError:
+            continue
+    return "\n".join(results) if results else "No matches found"
 
 if __name__ == "__main__":
-    print("Starting file mcp server")
-    mcp.run(transport="stdio")
\ No newline at end of file
+    # stdio by default; --transport streamable-http or sse runs it as a service
+    run_server(mcp, "file", default_port=8002)
@@ -1,186 +1,669 @@
-from flask import Flask, render_template, request, jsonify
-import asyncio
+from flask import Flask, Response, make_response, render_template, request, jsonify, has_request_context, stream_with_context
+import atexit
+import logging
 import os
 import json
-from mcp import ClientSession, StdioServerParameters
-from langchain_mcp_adapters.tools import load_mcp_tools
-from langgraph.prebuilt import create_react_agent
-from langchain_openai import ChatOpenAI
-from langchain_mcp_adapters.client import MultiServerMCPClient
-from langchain_ollama.chat_models import ChatOllama
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
 from dotenv import load_dotenv
+from mcp_session_pool import MCPSessionPool
+from tool_catalog import ToolCatalog
+from event_loop import BackgroundEventLoop, RequestTimeout, ClientDisconnected
+from llm_provider import get_llm_model, model_capacity, model_config
+from agent_cache import AgentCache
+from admission import (
+    DEFAULT_LLM_CONCURRENCY,
+    LLM_MAX_CONCURRENCY,
+    JobQueue,
+    LLMConcurrencyLimiter,
+    Overloaded,
+    RateLimiter,
+    parse_limits,
+)
+from conversation import (
+    ConversationHistory,
+    close_checkpointer,
+    create_checkpointer,
+    load_history,
+    new_session_id,
+    valid_session_id,
+)
+from tool_interceptors import ConcurrencyLimiter
+from server_registry import ServerExists, ServerRegistry
+from response_cache import ResponseCache, RESPONSE_CACHE_ENABLED
+from tool_result_cache import ToolResultCache, TOOL_CACHE_ENABLED, DEFAULT_TOOL_TTLS, MUTATING_TOOLS, parse_ttls
+from tool_result_compactor import ResultStore, ToolResultCompactor, TOOL_RESULT_COMPACT, find_handle
+from tool_selector import ToolSelector
+from http_cache import HTTP_COMPRESSION, ResponseCompressor, StaticFingerprints, cache_static, cached_json, etag_for
+from warm_up import WARM_UP, WARM_UP_MODEL, WarmUp
+from telemetry import (
+    LLMCallMetrics,
+    ToolCallMetrics,
+    configure_logging,
+    current_timings,
+    metrics_payload,
+    track_query,
+)
 load_dotenv()
+configure_logging()
+
+logger = logging.getLogger(__name__)
 
 
 app = Flask(__name__)
 
+# Static files are linked with a content hash, so browsers can keep them;
+# the compressor is registered first so it runs after every other hook
+if HTTP_COMPRESSION:
+    app.after_request(ResponseCompressor())
+app.after_request(cache_static)
+app.jinja_env.globals["static_url"] = StaticFingerprints(app.static_folder).url
+
 # Get the absolute path to server scripts
 current_dir = os.path.dirname(os.path.abspath(__file__))
-MODEL_PROVIDER = os.getenv("MODEL_PROVIDER", "ollama")  # "openai" or "ollama"
-OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "qwen14_max")  # Default Ollama model
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "fadsf11123fadf3vfa!!£fasdf4")
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "300"))  # Seconds, 0 disables
 
-servers = {
-    "mysql": {
-        "command": "python",
-        "args": [os.path.join(current_dir, "mysql_mcp_server.py")],
-        "transport": "stdio",
-    },
-    "file": {
+NETWORK_TRANSPORTS = ("streamable_http", "sse", "websocket")
+
+
+def url_transport(url):
+    """Transport of a server URL: SSE for .../sse endpoints, streamable HTTP otherwise"""
+    if url.startswith(("ws://", "wss://")):
+        return "websocket"
+    return "sse" if url.rstrip("/").endswith("/sse") else "streamable_http"
+
+
+def builtin_server(name, script):
+    """Config of a built-in server: a child process, or the service at <NAME>_MCP_URL if set"""
+    url = os.getenv(f"{name.upper()}_MCP_URL")
+    if url:
+        return {"url": url, "transport": url_transport(url)}
+    return {
         "command": "python",
-        "args": [os.path.join(current_dir, "file_mcp_server.py")],
+        "args": [os.path.join(current_dir, script)],
         "transport": "stdio",
+        "inherit_env": True,
     }
+
+
+# Built-in servers; servers added at runtime live in the shared registry
+builtin_servers = {
+    "mysql": builtin_server("mysql", "mysql_mcp_server.py"),
+    "file": builtin_server("file", "file_mcp_server.py"),
 }
 
+# Server configs are shared with the other worker processes through SQLite;
+# this dict is the local copy the session pool reads
+server_registry = ServerRegistry()
+server_registry.seed(builtin_servers)
+servers = server_registry.load()
+
+
+# Long-lived event loop shared by all request threads, so pooled MCP
+# sessions and HTTP clients stay alive between requests
+event_loop = BackgroundEventLoop()
+event_loop.start()
+
+# Tool calls emitted together by the model run concurrently; cap them globally.
+# The innermost interceptor times the MCP call itself
+tool_limiter = ConcurrencyLimiter()
+tool_interceptors = [tool_limiter, ToolCallMetrics()]
+
+# Opt-in cache for read-only tools; cache hits never take a concurrency slot
+tool_cache = None
+if TOOL_CACHE_ENABLED:
+    tool_cache = ToolResultCache(ttls={**DEFAULT_TOOL_TTLS, **parse_ttls(os.getenv("TOOL_CACHE_TTLS"))})
+    tool_interceptors.insert(0, tool_cache)
+
+# Large tool results are compacted before they reach the prompt; truncated
+# ones stay available in full at /api/tool_results/<handle>
+result_store = ResultStore()
+tool_compactor = None
+if TOOL_RESULT_COMPACT:
+    tool_compactor = ToolResultCompactor(result_store)
+    tool_interceptors.insert(0, tool_compactor)
+
+mcp_pool = MCPSessionPool(servers, tool_interceptors=tool_interceptors)
+if tool_cache is not None:
+    mcp_pool.add_tools_changed_listener(tool_cache.invalidate)
+event_loop.call_soon(mcp_pool.start_health_checks)
+event_loop.add_shutdown_hook(mcp_pool.close)
+
+# Tools are listed once per server and config, then served from memory
+tool_catalog = ToolCatalog(mcp_pool)
+
+# Conversation sessions: history is checkpointed per session id and
+# summarized once it outgrows its token budget
+checkpointer = event_loop.run(create_checkpointer())
+event_loop.add_shutdown_hook(lambda: close_checkpointer(checkpointer))
 
-def get_llm_model():
-    """Get the appropriate LLM model based on configuration"""
-    if MODEL_PROVIDER.lower() == "ollama":
-        return ChatOllama(
-            model=OLLAMA_MODEL,
-            base_url="http://localhost:11434",  # Default Ollama URL
-            temperature=0.7,
-            top_p=0.9
-        )
-    else:
-        os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
-        return ChatOpenAI(model="gpt-4o")
+# Each query gets the tools relevant to it, so model calls carry fewer schemas
+tool_selector = ToolSelector()
+
+# Compiled agents are reused until the model, the tool catalog or the tool subset changes
+agent_cache = AgentCache(checkpointer=checkpointer, history_hook=ConversationHistory)
+
+# Opt-in cache of final answers, served without invoking the model
+response_cache = ResponseCache() if RESPONSE_CACHE_ENABLED else None
+# Only runs calling read-only tools are cached: serving a cached answer
+# would silently skip the side effects of any other tool
+READ_ONLY_TOOLS = (set(DEFAULT_TOOL_TTLS) | set(parse_ttls(os.getenv("TOOL_CACHE_TTLS")))) - MUTATING_TOOLS
+
+# Admission control: agent runs wait in a bounded queue served by a fixed
+# number of workers, clients are rate limited, and model calls are capped
+# per provider
+job_queue = JobQueue()
+event_loop.call_soon(job_queue.start)
+event_loop.add_shutdown_hook(job_queue.close)
+rate_limiter = RateLimiter()
+llm_limits = parse_limits(LLM_MAX_CONCURRENCY)
+llm_limiters = {}
+llm_metrics = {}
+atexit.register(event_loop.shutdown)
 
 
 # Function to run async code
-def run_async(coroutine):
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(coroutine)
-    finally:
-        loop.close()
+def run_async(coroutine, timeout=REQUEST_TIMEOUT):
+    """Run a coroutine on the shared loop, cancelling it on timeout or client disconnect"""
+    environ = request.environ if has_request_context() else None
+    return event_loop.run(coroutine, timeout=timeout or None, environ=environ)
 
 async def get_available_tools():
     """Get all available tools from all the servers"""
     try:
-        # Correzione: Non usare async with context manager
-        client = MultiServerMCPClient(servers)
-        tools = await client.get_tools()
+        tools_by_server = await tool_catalog.get_tools_by_server()
         tool_info = []
         
-        # Debug information
-        print(f"Retrieved {len(tools)} tools")
-        for i, tool in enumerate(tools):
-            print(f"Tool {i}: {tool.__class__.__name__} - {tool.name}")
-            print(f"Tool {i} attributes: {dir(tool)}")
-            
-            # Extract available attributes safely
-            tool_data = {
-                "name": tool.name,
-                "description": tool.description if hasattr(tool, 'description') else "No description available",
-                # Since we don't have a server attribute, use the tool name to guess the server
-                "server": "mysql" if "sql" in tool.name.lower() else "file"
-            }
-            tool_info.append(tool_data)
+        for server_name, tools in tools_by_server.items():
+            for tool in tools:
+                # Extract available attributes safely
+                tool_data = {
+                    "name": tool.name,
+                    "description": tool.description if hasattr(tool, 'description') else "No description available",
+                    "server": server_name
+                }
+                tool_info.append(tool_data)
             
         return tool_info
-    except Exception as e:
-        print(f"Error getting tools: {str(e)}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Error getting tools")
         return []
 
 
-async def process_query(query):
-    """Process user query using multiple MCP servers"""
+async def get_agent(session=False, query=None):
+    """Get the compiled agent for the current model and the tools relevant to query (all tools without one)"""
+    model = get_llm_model()
+
+    # Get tools from all servers through the catalog cache
+    tools = await tool_catalog.get_tools()
+    if query is not None:
+        tools = await tool_selector.select(query, tools, tool_catalog.fingerprint)
+    logger.debug("Using model %s with %d tools", model.__class__.__name__, len(tools))
+
+    # Reuse the compiled agent for this model and tool set
+    return agent_cache.get(model_config(), tool_catalog.version, model, tools, session=session)
+
+
+async def get_cached_response(query):
+    """Look up a previous answer to query for the current model and tool set"""
+    if response_cache is None:
+        return None
+    await tool_catalog.get_tools()
+    cached = await response_cache.get(query, str(model_config()), tool_catalog.fingerprint)
+    if cached is not None:
+        logger.info("Response cache hit for query: %s", query)
+        return {**cached, "cached": True}
+    return None
+
+
+async def cache_response(query, result):
+    """Store an answer unless it is empty or the run called a tool that is not read-only"""
+    if response_cache is None or not result.get("final_answer"):
+        return
+    tools_used = {tool.get("tool") for tool in result.get("tool_usage", [])}
+    if not tools_used <= READ_ONLY_TOOLS:
+        logger.debug("Not caching the answer: the run called %s", ", ".join(sorted(map(str, tools_used - READ_ONLY_TOOLS))))
+        return
     try:
-        print(f"Processing query: {query}")
-        model = get_llm_model()
-        print(f"Using model: {model.__class__.__name__}")
+        await response_cache.put(query, str(model_config()), tool_catalog.fingerprint, result)
+    except Exception as e:
+        logger.warning("Error storing cached response: %s", e)
 
-        # Correzione: Non usare async with context manager
-        client = MultiServerMCPClient(servers)
-        
-        # Get tools from all servers
-        print("Getting tools from all servers")
-        tools = await client.get_tools()
-        print(f"Retrieved {len(tools)} tools")
 
-        # Create and run the agent
-        print("Creating agent")
-        agent = create_react_agent(model, tools)
+def message_text(content):
+    """Flatten message content that may be a list of content blocks"""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content or []
+    )
 
-        # Convert string query to proper format
-        print("Preparing messages")
-        messages = [{"role": "user", "content": query}]
 
-        print("Invoking agent")
-        agent_response = await agent.ainvoke({"messages": messages})
-        print("Agent response received")
+def get_llm_limiter():
+    """Get the model-call limiter of the current provider"""
+    provider = model_config()[0]
+    limiter = llm_limiters.get(provider)
+    if limiter is None:
+        limit = llm_limits.get(provider) or model_capacity(provider) or DEFAULT_LLM_CONCURRENCY
+        limiter = LLMConcurrencyLimiter(provider, limit)
+        llm_limiters[provider] = limiter
+    return limiter
+
+
+def get_llm_metrics():
+    """Get the model-call timer of the current provider and model"""
+    provider, model = model_config()[:2]
+    metrics = llm_metrics.get((provider, model))
+    if metrics is None:
+        metrics = llm_metrics[(provider, model)] = LLMCallMetrics(provider, model)
+    return metrics
+
+
+def run_config(session_id):
+    """Run config with the model-call limiter and timer and, for sessions, the checkpointed thread"""
+    # The timer comes after the limiter, so it does not count the wait for a slot
+    config = {"callbacks": [get_llm_limiter(), get_llm_metrics()]}
+    if session_id:
+        config["configurable"] = {"thread_id": session_id}
+    return config
+
+
+def current_turn(messages):
+    """Messages from the last user message on: what this query added to a session"""
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], HumanMessage):
+            return messages[index:]
+    return messages
+
+
+def record_tool_result(tool_data, content):
+    """Attach a tool result to its usage entry, with the handle of the full payload if it was truncated"""
+    tool_data['result'] = message_text(content)
+    handle = find_handle(tool_data['result'])
+    if handle:
+        tool_data['result_handle'] = handle
+
+
+async def process_query(query, session_id=None):
+    """Process user query using multiple MCP servers"""
+    with track_query("query") as timings:
+        try:
+            logger.info("Processing query: %s", query)
+            # Answers in a session depend on its history, so they bypass the response cache
+            if not session_id:
+                cached = await get_cached_response(query)
+                if cached is not None:
+                    return cached
+
+            agent = await get_agent(session=bool(session_id), query=query)
+
+            # Convert string query to proper format
+            messages = [{"role": "user", "content": query}]
+
+            agent_response = await agent.ainvoke({"messages": messages}, config=run_config(session_id))
+
+            # Track tool usage, in the order the model requested the calls
+            tool_usage = []
+            calls_by_id = {}
+            final_answer = None
+
+            if "messages" in agent_response:
+                messages = current_turn(agent_response["messages"])
+
+                for i, msg in enumerate(messages):
+                    msg_type = msg.__class__.__name__
+
+                    # Get tool calls
+                    if msg_type == "AIMessage" and hasattr(msg, 'tool_calls') and msg.tool_calls:
+                        for tool_call in msg.tool_calls:
+                            # Store the tool call
+                            tool_data = {
+                                "tool": tool_call.get('name', 'unknown'),
+                                "args": tool_call.get('args', {})
+                            }
+                            tool_usage.append(tool_data)
+                            calls_by_id[tool_call.get('id')] = tool_data
+
+                    # Get tool responses
+                    if msg_type == "ToolMessage" and hasattr(msg, 'content'):
+                        # Calls of one step run in parallel, so match each result
+                        # to its call by id rather than by position
+                        tool_data = calls_by_id.get(getattr(msg, 'tool_call_id', None))
+                        if tool_data is None:
+                            tool_data = next((t for t in tool_usage if 'result' not in t), None)
+                        if tool_data is not None:
+                            record_tool_result(tool_data, msg.content)
+
+                    # Get the final AI answer
+                    if i == len(messages) - 1 and msg_type == "AIMessage":
+                        final_answer = msg.content
+            else:
+                logger.warning("No messages in agent response, keys: %s", list(agent_response.keys()))
+
+            if final_answer and not session_id:
+                await cache_response(query, {"final_answer": final_answer, "tool_usage": tool_usage})
+
+            result = {
+                "final_answer": final_answer if final_answer else "No answer was generated.",
+                "tool_usage": tool_usage,
+                # Tokens of all model calls of the run; cached_tokens is the part of
+                # the input served from the provider's prompt cache
+                "usage": dict(timings.usage),
+            }
+            if session_id:
+                result["session_id"] = session_id
+            return result
+        except Exception as e:
+            logger.exception("Error in process_query")
+            timings.status = "error"
+            return {
+                "final_answer": f"Error processing your request: {str(e)}",
+                "tool_usage": []
+            }
+
+
+async def stream_query(query, session_id=None):
+    """Stream an agent run as events: LLM tokens, tool calls, tool results and the final answer"""
+    try:
+        logger.info("Streaming query: %s", query)
+        if not session_id:
+            cached = await get_cached_response(query)
+            if cached is not None:
+                yield {"type": "final", **cached}
+                return
+
+        agent = await get_agent(session=bool(session_id), query=query)
+        messages = [{"role": "user", "content": query}]
 
-        # Track tool usage
         tool_usage = []
+        calls_by_id = {}
         final_answer = None
 
-        if "messages" in agent_response:
-            messages = agent_response["messages"]
-            print(f"Response contains {len(messages)} messages")
-
-            for i, msg in enumerate(messages):
-                msg_type = msg.__class__.__name__
-                print(f"Message {i}: {msg_type}")
-
-                # Get tool calls
-                if msg_type == "AIMessage" and hasattr(msg, 'tool_calls') and msg.tool_calls:
-                    print(f"Found tool calls in message {i}: {len(msg.tool_calls)}")
-                    for tool_call in msg.tool_calls:
-                        # Store the tool call
-                        tool_data = {
-                            "tool": tool_call.get('name', 'unknown'),
-                            "args": tool_call.get('args', {})
+        async for mode, chunk in agent.astream(
+            {"messages": messages}, config=run_config(session_id), stream_mode=["messages", "updates"]
+        ):
+            if mode == "messages":
+                # Token-level output of the model node (not of history summarization)
+                msg, metadata = chunk
+                if isinstance(msg, AIMessageChunk) and metadata.get("langgraph_node") == "agent":
+                    text = message_text(msg.content)
+                    if text:
+                        yield {"type": "token", "content": text}
+                continue
+
+            # Complete messages produced by each node; the history hook only
+            # rewrites earlier turns
+            for node, update in chunk.items():
+                if node == "pre_model_hook":
+                    continue
+                for msg in (update or {}).get("messages", []):
+                    if isinstance(msg, ToolMessage):
+                        tool_data = calls_by_id.get(msg.tool_call_id) or {}
+                        record_tool_result(tool_data, msg.content)
+                        yield {
+                            "type": "tool_result",
+                            "id": msg.tool_call_id,
+                            "tool": msg.name,
+                            "result": tool_data["result"],
+                            "result_handle": tool_data.get("result_handle"),
                         }
-                        tool_usage.append(tool_data)
-                        print(f"Added tool usage: {tool_data}")
-
-                # Get tool responses
-                if msg_type == "ToolMessage" and hasattr(msg, 'content'):
-                    # Add the tool response to the most recent tool call
-                    if tool_usage and 'result' not in tool_usage[-1]:
-                        tool_usage[-1]['result'] = msg.content
-                        print(f"Added result to tool")
-
-                # Get the final AI answer
-                if i == len(messages) - 1 and msg_type == "AIMessage":
-                    final_answer = msg.content
-                    print(f"Final answer captured")
-        else:
-            print("No messages in response")
-            print(f"Response keys: {agent_response.keys()}")
+                    elif isinstance(msg, AIMessage) and msg.tool_calls:
+                        for tool_call in msg.tool_calls:
+                            tool_data = {
+                                "tool": tool_call.get('name', 'unknown'),
+                                "args": tool_call.get('args', {})
+                            }
+                            tool_usage.append(tool_data)
+                            calls_by_id[tool_call.get('id')] = tool_data
+                            yield {"type": "tool_call", "id": tool_call.get('id'), **tool_data}
+                    elif isinstance(msg, AIMessage):
+                        final_answer = msg.content
 
-        return {
+        if final_answer and not session_id:
+            await cache_response(query, {"final_answer": final_answer, "tool_usage": tool_usage})
+
+        event = {
+            "type": "final",
             "final_answer": final_answer if final_answer else "No answer was generated.",
             "tool_usage": tool_usage
         }
+        timings = current_timings()
+        if timings is not None:
+            event["usage"] = dict(timings.usage)
+        if session_id:
+            event["session_id"] = session_id
+        yield event
     except Exception as e:
-        print(f"Error in process_query: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return {
-            "final_answer": f"Error processing your request: {str(e)}",
-            "tool_usage": []
-        }
+        logger.exception("Error in stream_query")
+        yield {"type": "error", "error": f"Error processing your request: {str(e)}"}
 
 
+async def stream_job(job, query, session_id):
+    """Job body of a streaming query: publish its events on the job"""
+    final = None
+    with track_query("stream") as timings:
+        async for event in stream_query(query, session_id):
+            job.events.put_nowait(event)
+            if event["type"] in ("final", "error"):
+                final = event
+        if final is None or final["type"] == "error":
+            timings.status = "error"
+    return final
+
+
+async def job_events(job):
+    """Yield the events of a streaming job, announcing its place in the queue while it waits"""
+    try:
+        if job.status == "queued":
+            yield {"type": "queued", "job_id": job.id, "position": job_queue.position(job)}
+        while True:
+            event = await job.events.get()
+            if event is None:
+                break
+            yield event
+        if job.status == "failed":
+            yield {"type": "error", "error": job.error}
+    finally:
+        # No-op once the job finished; stops the run if the client went away
+        job.cancel()
+
+
+async def submit_job(client, factory, stream=False):
+    return job_queue.submit(client, factory, stream=stream)
+
+
+async def get_job_info(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return None
+    info = job.info()
+    if job.status == "queued":
+        position = job_queue.position(job)
+        info["position"] = position
+        info["estimated_wait"] = round(job_queue.estimated_wait(position), 1)
+    return info
+
+
+async def cancel_job(job_id):
+    job = job_queue.get(job_id)
+    if job is not None:
+        job.cancel()
+    return job
+
+
+def client_id():
+    """Key for per-client rate limits"""
+    return request.remote_addr or "unknown"
+
+
+def sse_event(event):
+    """Format an event dict as a Server-Sent Events message"""
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+async def warm_up_servers():
+    """Start every configured MCP server, failing if one of them did not come up"""
+    await mcp_pool.warm_up()
+    status = mcp_pool.status()
+    failed = [name for name in list(servers) if not status.get(name, {}).get("alive")]
+    if failed:
+        raise RuntimeError(f"MCP servers not started: {', '.join(failed)}")
+
+
+async def ping_model():
+    """Send the model a short prompt, loading a local model into memory"""
+    model = get_llm_model()
+    if hasattr(model, "warm_up"):
+        # Every Ollama server has to load the model, not just the first one picked
+        await model.warm_up()
+        return
+    await model.ainvoke([HumanMessage(content="Reply with OK.")], config=run_config(None))
+
+
+# Optional boot-time warm-up, so the first request does not pay for spawning
+# servers, listing tools and building the agent; /api/ready reports when it is done
+warm_up = None
+if WARM_UP:
+    warm_up_steps = [("mcp_servers", warm_up_servers), ("tools", tool_catalog.get_tools), ("agent", get_agent)]
+    if WARM_UP_MODEL:
+        warm_up_steps.append(("model", ping_model))
+    warm_up = WarmUp(warm_up_steps)
+    event_loop.submit(warm_up.run())
+
+
+@app.before_request
+def sync_servers():
+    """Pick up servers added by other worker processes"""
+    for name in server_registry.sync(servers):
+        logger.info("Server '%s' changed in the registry", name)
+        event_loop.call_soon(tool_catalog.invalidate, name)
+
+@app.errorhandler(RequestTimeout)
+def handle_request_timeout(e):
+    logger.warning("Request timed out: %s", e)
+    return jsonify({"error": str(e)}), 504
+
+@app.errorhandler(Overloaded)
+def handle_overloaded(e):
+    logger.warning("Request refused: %s", e)
+    response = jsonify({"error": str(e), "retry_after": e.retry_after})
+    response.status_code = e.status_code
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response
+
+@app.errorhandler(ClientDisconnected)
+def handle_client_disconnected(e):
+    logger.info("Request cancelled: %s", e)
+    return jsonify({"error": str(e)}), 499
+
 @app.route('/api/tools', methods=['GET'])
 def get_tools():
     tools = run_async(get_available_tools())
-    return jsonify(tools)
+    return cached_json(tools, etag_for(tools), tool_catalog.built_at)
+
+async def get_catalog_info():
+    """Read the catalog metadata on the loop that owns it"""
+    return tool_catalog.info()
+
+@app.route('/api/tools/catalog', methods=['GET'])
+def get_tool_catalog():
+    """Return the tool catalog version and build timestamps"""
+    return jsonify(run_async(get_catalog_info()))
+
+@app.route('/api/tools/refresh', methods=['POST'])
+def refresh_tools():
+    """Rebuild the tool catalog for one server, or all of them"""
+    try:
+        data = request.get_json(silent=True) or {}
+        server_name = data.get('server')
+        if server_name is not None and server_name not in servers:
+            return jsonify({"success": False, "error": f"Server '{server_name}' not found"}), 404
+
+        run_async(tool_catalog.refresh(server_name))
+        return jsonify({"success": True, "catalog": run_async(get_catalog_info())})
+    except (RequestTimeout, ClientDisconnected):
+        raise
+    except Exception as e:
+        logger.exception("Error in refresh_tools")
+        return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route('/api/servers', methods=['GET'])
 def get_servers():
     """Return list of available MCP servers"""
-    return jsonify(servers)
+    return cached_json(servers, etag_for(servers), server_registry.last_modified())
+
+@app.route('/api/pool', methods=['GET'])
+def get_pool_status():
+    """Return the state of the pooled MCP sessions"""
+    return jsonify({"servers": mcp_pool.status(), "tool_calls": tool_limiter.status()})
+
+@app.route('/api/tool_cache', methods=['GET'])
+def get_tool_cache_stats():
+    """Return hit/miss counters of the tool result cache"""
+    if tool_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **tool_cache.stats()})
+
+@app.route('/api/tool_results', methods=['GET'])
+def get_tool_result_stats():
+    """Return counters of the tool result compactor and its payload store"""
+    if tool_compactor is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **tool_compactor.stats()})
+
+@app.route('/api/tool_selection', methods=['GET'])
+def get_tool_selection():
+    """Return tool selection counters; with ?query=..., also the tools ranked for that query"""
+    result = tool_selector.stats()
+    query = request.args.get('query')
+    if query:
+        async def rank():
+            tools = await tool_catalog.get_tools()
+            selected, outcome, _ = await tool_selector.pick(query, tools, tool_catalog.fingerprint)
+            ranked = await tool_selector.rank(query, tools, tool_catalog.fingerprint)
+            return [tool.name for tool in selected], outcome, ranked
+        selected, outcome, ranked = run_async(rank())
+        result.update({
+            "query": query,
+            "outcome": outcome,
+            "selected": selected,
+            "ranking": [{"tool": name, "score": round(score, 4)} for name, score in ranked],
+        })
+    return jsonify(result)
+
+@app.route('/api/tool_results/<handle>', methods=['GET'])
+def get_tool_result(handle):
+    """Return the full payload of a truncated tool result, optionally a slice of it"""
+    entry = result_store.get(handle)
+    if entry is None:
+        return jsonify({"error": "Unknown or expired result handle"}), 404
+    offset = max(0, request.args.get('offset', 0, type=int))
+    length = request.args.get('length', type=int)
+    content = entry["content"]
+    end = len(content) if length is None else offset + max(0, length)
+    return jsonify({
+        **entry,
+        "content": content[offset:end],
+        "offset": offset,
+        "size": len(content),
+        "next_offset": end if end < len(content) else None,
+    })
+
+@app.route('/api/response_cache', methods=['GET', 'DELETE'])
+def response_cache_route():
+    """Return response cache counters, or clear the cache with DELETE"""
+    if response_cache is None:
+        return jsonify({"enabled": False})
+    if request.method == 'DELETE':
+        response_cache.clear()
+    return jsonify({"enabled": True, **response_cache.stats()})
+
+def positive_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
 
 @app.route('/api/add_server', methods=['POST'])
 def add_server():
-    """Add a new MCP server to the servers dictionary"""
+    """Add a new MCP server to the server registry"""
     try:
         data = request.json
         if not data:
@@ -196,39 +679,104 @@ def add_server():
         if not config:
             return jsonify({"success": False, "error": "Server configuration is required"}), 400
             
-        if not config.get('command'):
-            return jsonify({"success": False, "error": "Command is required"}), 400
-            
-        if not config.get('args') or not isinstance(config['args'], list) or not config['args']:
-            return jsonify({"success": False, "error": "Args must be a non-empty list"}), 400
-            
         if not config.get('transport'):
             return jsonify({"success": False, "error": "Transport is required"}), 400
+
+        # Accept the names FastMCP uses on the server side ("streamable-http")
+        transport = config['transport'].replace('-', '_')
+        if transport == 'stdio':
+            if not config.get('command'):
+                return jsonify({"success": False, "error": "Command is required"}), 400
+
+            if not config.get('args') or not isinstance(config['args'], list) or not config['args']:
+                return jsonify({"success": False, "error": "Args must be a non-empty list"}), 400
+
+            server_config = {
+                "command": config['command'],
+                "args": config['args'],
+                "transport": transport
+            }
+        elif transport in NETWORK_TRANSPORTS:
+            url = config.get('url', '')
+            schemes = ('ws://', 'wss://') if transport == 'websocket' else ('http://', 'https://')
+            if not url.startswith(schemes):
+                return jsonify({"success": False, "error": f"A {' or '.join(schemes)} URL is required"}), 400
+
+            server_config = {"url": url, "transport": transport}
+        else:
+            return jsonify({"success": False, "error": f"Unsupported transport '{config['transport']}'"}), 400
+        if config.get('pool_size') is not None:
+            pool_size = config['pool_size']
+            if isinstance(pool_size, bool) or not isinstance(pool_size, int) or pool_size < 1:
+                return jsonify({"success": False, "error": "pool_size must be a positive integer"}), 400
+            server_config['pool_size'] = pool_size
+        if config.get('call_timeout') is not None:
+            if not positive_number(config['call_timeout']):
+                return jsonify({"success": False, "error": "call_timeout must be a positive number of seconds"}), 400
+            server_config['call_timeout'] = config['call_timeout']
+        if config.get('tool_timeouts') is not None:
+            tool_timeouts = config['tool_timeouts']
+            if not isinstance(tool_timeouts, dict) or not all(
+                isinstance(tool, str) and tool and positive_number(seconds) for tool, seconds in tool_timeouts.items()
+            ):
+                return jsonify({"success": False, "error": "tool_timeouts must map tool names to positive numbers of seconds"}), 400
+            server_config['tool_timeouts'] = tool_timeouts
+
+        # The registry rejects names already taken, by this worker or another one
+        try:
+            server_registry.add(name, server_config)
+        except ServerExists as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        servers[name] = server_config
         
-        # Check if server with this name already exists
-        if name in servers:
-            return jsonify({"success": False, "error": f"Server '{name}' already exists"}), 400
-        
-        # Add the new server
-        servers[name] = {
-            "command": config['command'],
-            "args": config['args'],
-            "transport": config['transport']
-        }
-        
-        print(f"Added new server: {name} with config: {servers[name]}")
+        logger.info("Added new server: %s with config: %s", name, servers[name])
+        event_loop.call_soon(tool_catalog.invalidate, name)
         
         return jsonify({"success": True, "message": f"Server '{name}' added successfully"})
     except Exception as e:
-        print(f"Error in add_server: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in add_server")
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/sessions', methods=['POST'])
+def create_session():
+    """Start a conversation session; pass its id as session_id to the query endpoints"""
+    return jsonify({"session_id": new_session_id()})
+
+async def get_session_messages(session_id):
+    messages = await load_history(checkpointer, session_id)
+    if messages is None:
+        return None
+    return [
+        {
+            "role": msg.type,
+            "content": message_text(msg.content),
+            "tool_calls": [
+                {"tool": call["name"], "args": call["args"]} for call in getattr(msg, 'tool_calls', None) or []
+            ],
+        }
+        for msg in messages
+    ]
+
+@app.route('/api/sessions/<session_id>', methods=['GET', 'DELETE'])
+def session_route(session_id):
+    """Return the stored history of a session, or delete the session with DELETE"""
+    if not valid_session_id(session_id):
+        return jsonify({"error": "Invalid session_id"}), 400
+    if request.method == 'DELETE':
+        run_async(checkpointer.adelete_thread(session_id))
+        return jsonify({"success": True, "session_id": session_id})
+    messages = run_async(get_session_messages(session_id))
+    if messages is None:
+        return jsonify({"error": f"Session '{session_id}' not found"}), 404
+    return jsonify({"session_id": session_id, "messages": messages})
+
 @app.route('/')
 def index():
-    # Serve the main template
-    return render_template('index.html')
+    # Serve the main template; its assets are cached separately
+    response = make_response(render_template('index.html'))
+    response.add_etag()
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 # Process query endpoint
 @app.route('/api/process_query', methods=['POST'])
@@ -236,19 +784,111 @@ def process_query_route():
     try:
         data = request.json
         query = data.get('query', '')
+        session_id = data.get('session_id')
         
         if not query:
             return jsonify({"error": "Query is required"}), 400
+        if session_id is not None and not valid_session_id(session_id):
+            return jsonify({"error": "Invalid session_id"}), 400
             
-        print(f"Processing query via /api/process_query: {query}")
-        result = run_async(process_query(query))
+        client = client_id()
+        rate_limiter.check(client)
+        result = run_async(job_queue.run(client, lambda job: process_query(query, session_id)))
         return jsonify(result)
+    except (RequestTimeout, ClientDisconnected, Overloaded):
+        raise
     except Exception as e:
-        print(f"Error in process_query_route: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in process_query_route")
         return jsonify({"error": str(e)}), 500
 
+# Streaming variant of /api/process_query (Server-Sent Events)
+@app.route('/api/process_query/stream', methods=['POST'])
+def process_query_stream_route():
+    data = request.json or {}
+    query = data.get('query', '')
+    session_id = data.get('session_id')
+
+    if not query:
+        return jsonify({"error": "Query is required"}), 400
+    if session_id is not None and not valid_session_id(session_id):
+        return jsonify({"error": "Invalid session_id"}), 400
+
+    client = client_id()
+    rate_limiter.check(client)
+    job = run_async(submit_job(client, lambda job: stream_job(job, query, session_id), stream=True))
+
+    def generate():
+        try:
+            for event in event_loop.iterate(job_events(job), timeout=REQUEST_TIMEOUT or None):
+                yield sse_event(event)
+        except RequestTimeout as e:
+            yield sse_event({"type": "error", "error": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Asynchronous variant: submit a query, then poll its job
+@app.route('/api/jobs', methods=['POST'])
+def submit_job_route():
+    data = request.get_json(silent=True) or {}
+    query = data.get('query', '')
+    session_id = data.get('session_id')
+
+    if not query:
+        return jsonify({"error": "Query is required"}), 400
+    if session_id is not None and not valid_session_id(session_id):
+        return jsonify({"error": "Invalid session_id"}), 400
+
+    client = client_id()
+    rate_limiter.check(client)
+    job = run_async(submit_job(client, lambda job: process_query(query, session_id)))
+    info = run_async(get_job_info(job.id))
+    status_url = f"/api/jobs/{job.id}"
+    response = jsonify({**info, "status_url": status_url})
+    response.status_code = 202
+    response.headers["Location"] = status_url
+    return response
+
+@app.route('/api/jobs/<job_id>', methods=['GET', 'DELETE'])
+def job_route(job_id):
+    """Return the status (and result, once done) of a job, or cancel it with DELETE"""
+    if request.method == 'DELETE':
+        job = run_async(cancel_job(job_id))
+        if job is None:
+            return jsonify({"error": f"Job '{job_id}' not found"}), 404
+    info = run_async(get_job_info(job_id))
+    if info is None:
+        return jsonify({"error": f"Job '{job_id}' not found"}), 404
+    return jsonify(info)
+
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 503 until the boot-time warm-up has finished"""
+    if warm_up is None:
+        return jsonify({"ready": True, "warm_up": {"enabled": False}})
+    status_code = 200 if warm_up.ready else 503
+    return jsonify({"ready": warm_up.ready, "warm_up": {"enabled": True, **warm_up.status()}}), status_code
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics: per-stage latency histograms and token counters"""
+    payload, content_type = metrics_payload()
+    return Response(payload, content_type=content_type)
+
+@app.route('/api/queue', methods=['GET'])
+def get_queue_status():
+    """Return the state of the job queue, rate limiter, model-call limiters and model servers"""
+    model = get_llm_model()
+    return jsonify({
+        "jobs": job_queue.status(),
+        "rate_limit": rate_limiter.status(),
+        "llm": {provider: limiter.status() for provider, limiter in llm_limiters.items()},
+        "model_servers": model.status() if hasattr(model, "status") else None,
+    })
+
 # Keep the /api/calculate endpoint for backward compatibility
 @app.route('/api/calculate', methods=['POST'])
 def calculate():
@@ -259,14 +899,15 @@ def calculate():
         if not query:
             return jsonify({"error": "Query is required"}), 400
             
-        print(f"Processing query via /api/calculate: {query}")
         # Process query
-        result = run_async(process_query(query))
+        client = client_id()
+        rate_limiter.check(client)
+        result = run_async(job_queue.run(client, lambda job: process_query(query)))
         return jsonify(result)
+    except (RequestTimeout, ClientDisconnected, Overloaded):
+        raise
     except Exception as e:
-        print(f"Error in calculate: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in calculate")
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
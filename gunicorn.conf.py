@@ -0,0 +1,36 @@
+# gunicorn.conf.py
+import multiprocessing
+import os
+import tempfile
+
+# Each worker runs its own event loop, MCP session pool and job queue, so
+# memory and MCP server processes grow with the number of workers
+bind = f"0.0.0.0:{os.getenv('PORT', '5008')}"
+workers = int(os.getenv("WEB_WORKERS", str(min(multiprocessing.cpu_count(), 4))))
+# Threads serve requests while agent runs wait on the worker's event loop;
+# streamed responses hold a thread for their whole duration
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "16"))
+# Longer than REQUEST_TIMEOUT, so the app answers 504 before gunicorn kills the worker
+timeout = int(os.getenv("WEB_TIMEOUT", str(int(float(os.getenv("REQUEST_TIMEOUT", "300"))) + 30)))
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("WEB_KEEPALIVE", "5"))
+# Import the libraries once in the master (see wsgi.py)
+preload_app = True
+accesslog = "-"
+
+# Workers write their Prometheus metrics to files in this directory, and
+# /metrics merges them whichever worker answers. It must start out empty
+if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="mcp-client-metrics-")
+
+
+def post_worker_init(worker):
+    # Start the worker's runtime before it accepts requests
+    import wsgi
+    wsgi.app._app = wsgi.load_app()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
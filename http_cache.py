@@ -0,0 +1,132 @@
+# http_cache.py
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+from flask import jsonify, request, url_for
+
+try:
+    # Brotli is optional; without it responses are only gzipped
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compress responses for clients that accept gzip (or brotli, when installed)
+HTTP_COMPRESSION = os.getenv("HTTP_COMPRESSION", "true").lower() in ("1", "true", "yes")
+# Smaller bodies are sent as they are
+HTTP_COMPRESS_MIN_BYTES = int(os.getenv("HTTP_COMPRESS_MIN_BYTES", "1024"))
+# gzip level (1-9); brotli uses the matching quality
+HTTP_COMPRESS_LEVEL = int(os.getenv("HTTP_COMPRESS_LEVEL", "6"))
+# Seconds browsers keep a fingerprinted static file without asking again
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", "31536000"))
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+
+def etag_for(value):
+    """Stable validator of a JSON-serializable value"""
+    encoded = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def cached_json(payload, etag, last_modified=None):
+    """JSON response the client revalidates on every use, answered with 304 while etag is unchanged"""
+    response = jsonify(payload)
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = datetime.fromtimestamp(last_modified, timezone.utc)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+class StaticFingerprints:
+    """Content hashes of static files, added to their URLs.
+
+    A URL changes whenever the file does, so browsers may keep it for a year
+    and still pick up a new version after a deploy.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._hashes = {}
+
+    def version(self, filename):
+        path = os.path.join(self.folder, filename)
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._hashes.get(filename)
+        if cached is None or cached[0] != mtime:
+            with open(path, "rb") as f:
+                cached = self._hashes[filename] = (mtime, hashlib.sha256(f.read()).hexdigest()[:12])
+        return cached[1]
+
+    def url(self, filename):
+        return url_for("static", filename=filename, v=self.version(filename))
+
+
+class ResponseCompressor:
+    """Compresses response bodies with the best encoding the client accepts.
+
+    Streamed responses (the SSE endpoints) are left alone. Static files are
+    compressed once per version and kept in memory. A compressed response's
+    ETag becomes weak, so it still validates the uncompressed one.
+    """
+
+    def __init__(self, min_bytes=HTTP_COMPRESS_MIN_BYTES, level=HTTP_COMPRESS_LEVEL):
+        self.min_bytes = min_bytes
+        self.level = level
+        self._static = {}
+
+    def encoding(self):
+        accepted = request.accept_encodings
+        if brotli is not None and accepted["br"]:
+            return "br"
+        if accepted["gzip"]:
+            return "gzip"
+        return None
+
+    def compress(self, data, encoding):
+        if encoding == "br":
+            return brotli.compress(data, quality=min(11, self.level))
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def __call__(self, response):
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or response.is_streamed and not response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = self.encoding()
+        if encoding is None or (response.content_length or 0) < self.min_bytes:
+            return response
+
+        # Static files arrive as a file wrapper; read them into memory
+        response.direct_passthrough = False
+        data = response.get_data()
+        etag, _ = response.get_etag()
+        key = (request.path, etag, encoding) if request.endpoint == "static" and etag else None
+        compressed = self._static.get(key)
+        if compressed is None:
+            compressed = self.compress(data, encoding)
+            if key is not None:
+                self._static[key] = compressed
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        if etag:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def cache_static(response):
+    """Let browsers keep fingerprinted static files for STATIC_MAX_AGE"""
+    if request.endpoint == "static" and request.args.get("v") and response.status_code in (200, 304):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+    return response
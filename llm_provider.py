@@ -0,0 +1,65 @@
+# llm_provider.py
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_BASE_URL = "http://localhost:11434"  # Default Ollama URL
+OPENAI_MODEL = "gpt-4o"
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def model_config():
+    """Current provider/model configuration, read from the environment on every call"""
+    provider = os.getenv("MODEL_PROVIDER", "ollama").lower()  # "openai" or "ollama"
+    if provider == "ollama":
+        base_urls = os.getenv("OLLAMA_BASE_URLS", os.getenv("OLLAMA_BASE_URL", OLLAMA_BASE_URL))
+        return ("ollama", os.getenv("OLLAMA_MODEL", "qwen14_max"), base_urls)
+    return ("openai", OPENAI_MODEL)
+
+
+def chat_model_class(provider):
+    """Import the chat model class of a provider; the other provider's package is never loaded"""
+    if provider == "ollama":
+        from ollama_pool import PooledChatOllama
+        return PooledChatOllama
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI
+
+
+def _build_model(config):
+    model_class = chat_model_class(config[0])
+    if config[0] == "ollama":
+        _, model, base_urls = config
+        return model_class(
+            model=model,
+            base_urls=base_urls,
+            temperature=0.7,
+            top_p=0.9
+        )
+    os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY", "fadsf11123fadf3vfa!!£fasdf4")
+    return model_class(model=config[1])
+
+
+def get_llm_model():
+    """Get the LLM client for the current configuration, reusing it while the configuration is unchanged"""
+    config = model_config()
+    with _models_lock:
+        model = _models.get(config)
+        if model is None:
+            logger.info("Creating LLM client for %s", config)
+            # Only one configuration is active at a time; drop the old clients
+            _models.clear()
+            model = _models[config] = _build_model(config)
+        return model
+
+
+def model_capacity(provider):
+    """Model calls the configured servers of a provider can process at once, if known"""
+    if provider == "ollama":
+        from ollama_pool import parse_backends
+        return sum(parallel for _, parallel in parse_backends(model_config()[2]))
+    return None
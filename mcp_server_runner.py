@@ -0,0 +1,38 @@
+# mcp_server_runner.py
+import argparse
+import logging
+import os
+import sys
+
+TRANSPORTS = ("stdio", "streamable-http", "sse")
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+# stdio runs the server as a child process of the app; the HTTP transports
+# run it as a long-lived service shared by every app worker
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "stdio")
+MCP_HOST = os.getenv("MCP_HOST", "127.0.0.1")
+
+
+def run_server(mcp, name, default_port):
+    """Run a FastMCP server on the transport, host and port given on the command line"""
+    parser = argparse.ArgumentParser(description=f"{name} MCP server")
+    parser.add_argument("--transport", choices=TRANSPORTS, default=MCP_TRANSPORT)
+    parser.add_argument("--host", default=MCP_HOST)
+    parser.add_argument("--port", type=int, default=int(os.getenv("MCP_PORT", default_port)))
+    args = parser.parse_args()
+
+    # stdout carries the MCP protocol over stdio, so log to stderr
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), stream=sys.stderr)
+    logger = logging.getLogger(name)
+    if args.transport == "stdio":
+        logger.info("Starting %s mcp server", name)
+    else:
+        mcp.settings.host = args.host
+        mcp.settings.port = args.port
+        if args.host not in LOOPBACK_HOSTS:
+            # The DNS rebinding protection FastMCP sets up for localhost would
+            # reject clients calling the service by any other host name
+            mcp.settings.transport_security = None
+        path = mcp.settings.streamable_http_path if args.transport == "streamable-http" else mcp.settings.sse_path
+        logger.info("Starting %s mcp server at http://%s:%s%s", name, args.host, args.port, path)
+    mcp.run(transport=args.transport)
@@ -0,0 +1,440 @@
+# mcp_session_pool.py
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
+import anyio
+from mcp import types
+from mcp.shared.exceptions import McpError
+from langchain_mcp_adapters.sessions import create_session
+from langchain_mcp_adapters.tools import convert_mcp_tool_to_langchain_tool
+
+from circuit_breaker import CircuitBreaker
+from telemetry import MCP_CONNECT_SECONDS, timed
+
+logger = logging.getLogger(__name__)
+
+# Pool settings, overridable per server with a "pool_size" key in its config
+DEFAULT_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("MCP_HEALTH_CHECK_INTERVAL", "30"))
+PING_TIMEOUT = float(os.getenv("MCP_PING_TIMEOUT", "5"))
+SPAWN_TIMEOUT = float(os.getenv("MCP_SPAWN_TIMEOUT", "30"))
+# Sessions idle for longer than this are pinged before being handed out
+PING_IDLE_AFTER = float(os.getenv("MCP_PING_IDLE_AFTER", "5"))
+# Deadlines in seconds, including the wait for a session and starting the
+# server: a tool call ("call_timeout" in a server config overrides it), and
+# listing a server's tools
+CALL_TIMEOUT = float(os.getenv("MCP_CALL_TIMEOUT", "60"))
+LIST_TOOLS_TIMEOUT = float(os.getenv("MCP_LIST_TOOLS_TIMEOUT", "30"))
+# Per-tool deadlines, e.g. "search_files=20,mysql_query=30" ("tool_timeouts"
+# in a server config overrides them for that server)
+TOOL_TIMEOUTS = os.getenv("MCP_TOOL_TIMEOUTS", "")
+
+# Keys of a server config that belong to the pool and not to the MCP transport
+POOL_OPTION_KEYS = ("pool_size", "inherit_env", "call_timeout", "tool_timeouts")
+
+
+def parse_timeouts(value):
+    """Parse "tool=seconds,tool=seconds" settings"""
+    timeouts = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            name, seconds = item.split("=", 1)
+            timeouts[name.strip()] = float(seconds)
+    return timeouts
+
+
+def connection_params(config):
+    """Strip pool-only options from a server config"""
+    params = {k: v for k, v in config.items() if k not in POOL_OPTION_KEYS}
+    if config.get("inherit_env"):
+        # stdio servers otherwise only get a minimal environment (PATH, HOME...),
+        # so settings such as MYSQL_URL would never reach them
+        params["env"] = {**os.environ, **(params.get("env") or {})}
+    return params
+
+
+class PooledSession:
+    """One initialized MCP session, kept open by its own task"""
+
+    def __init__(self, server_name, connection, on_tools_changed=None):
+        self.server_name = server_name
+        self.connection = connection
+        self.on_tools_changed = on_tools_changed
+        self.session = None
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._error = None
+        self._task = None
+        self.last_used = time.monotonic()
+
+    async def start(self):
+        """Spawn the server and run the MCP initialize handshake"""
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._ready.wait(), SPAWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise RuntimeError(f"Timed out starting MCP server '{self.server_name}'")
+        if self._error is not None:
+            raise self._error
+
+    async def _run(self):
+        # The transport context must be entered and exited by the same task,
+        # so the session lives here until close() is requested
+        connection = dict(self.connection)
+        session_kwargs = dict(connection.get("session_kwargs") or {})
+        session_kwargs.setdefault("message_handler", self._handle_message)
+        connection["session_kwargs"] = session_kwargs
+        try:
+            async with create_session(connection) as session:
+                await session.initialize()
+                self.session = session
+                self._ready.set()
+                await self._closing.wait()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def _handle_message(self, message):
+        if isinstance(message, types.ServerNotification) and isinstance(
+            message.root, types.ToolListChangedNotification
+        ):
+            logger.info("MCP server '%s' changed its tool list", self.server_name)
+            if self.on_tools_changed is not None:
+                self.on_tools_changed(self.server_name)
+        await anyio.lowlevel.checkpoint()
+
+    @property
+    def alive(self):
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def ping(self):
+        """Return True if the server answers a ping within PING_TIMEOUT"""
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), PING_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    async def close(self):
+        """Close the session and terminate the server process"""
+        self._closing.set()
+        if self._task is not None and not self._task.done():
+            try:
+                await asyncio.wait_for(self._task, SPAWN_TIMEOUT)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                self._task.cancel()
+
+
+class ServerPool:
+    """Bounded set of warm sessions for a single MCP server"""
+
+    def __init__(self, name, config, on_tools_changed=None):
+        self.name = name
+        self.config = dict(config)
+        self.on_tools_changed = on_tools_changed
+        self.size = int(config.get("pool_size", DEFAULT_POOL_SIZE))
+        self._semaphore = asyncio.Semaphore(self.size)
+        self._idle = []
+        self._sessions = []
+        self.respawns = 0
+        # A new config gets a fresh breaker: it may well fix what failed
+        self.breaker = CircuitBreaker(name)
+
+    async def _spawn(self):
+        pooled = PooledSession(self.name, connection_params(self.config), self.on_tools_changed)
+        with timed("mcp_connect", MCP_CONNECT_SECONDS, server=self.name):
+            await pooled.start()
+        self._sessions.append(pooled)
+        return pooled
+
+    async def _discard(self, pooled):
+        if pooled in self._sessions:
+            self._sessions.remove(pooled)
+        await pooled.close()
+
+    @asynccontextmanager
+    async def checkout(self):
+        """Borrow an initialized session, respawning it if the server died"""
+        async with self._semaphore:
+            pooled = self._idle.pop() if self._idle else None
+            if pooled is not None and time.monotonic() - pooled.last_used > PING_IDLE_AFTER:
+                alive = await pooled.ping()
+            else:
+                alive = pooled is not None and pooled.alive
+            if pooled is not None and not alive:
+                logger.warning("MCP server '%s' session died, respawning", self.name)
+                await self._discard(pooled)
+                self.respawns += 1
+                pooled = None
+            if pooled is None:
+                pooled = await self._spawn()
+
+            try:
+                yield pooled.session
+            except BaseException:
+                # The session may be half-way through a request; only keep it
+                # if the server still answers
+                if await pooled.ping():
+                    self._idle.append(pooled)
+                else:
+                    await self._discard(pooled)
+                    self.respawns += 1
+                raise
+            else:
+                self._idle.append(pooled)
+            finally:
+                pooled.last_used = time.monotonic()
+
+    async def warm_up(self):
+        """Start sessions until the pool is full"""
+        while len(self._sessions) < self.size:
+            self._idle.append(await self._spawn())
+
+    async def health_check(self):
+        """Ping idle sessions and replace the ones that no longer answer"""
+        for pooled in list(self._idle):
+            if self._semaphore.locked():
+                # Every slot is in use; the sessions are checked on checkout
+                return
+            # Hold a slot and take the session out of the idle list while it
+            # is pinged, so no checkout can hand it out at the same time
+            async with self._semaphore:
+                if pooled not in self._idle:
+                    continue
+                self._idle.remove(pooled)
+                if await pooled.ping():
+                    self._idle.append(pooled)
+                    continue
+                logger.warning("MCP server '%s' failed health check, respawning", self.name)
+                await self._discard(pooled)
+                self.respawns += 1
+                try:
+                    self._idle.append(await self._spawn())
+                except Exception as e:
+                    logger.error("Error respawning MCP server '%s': %s", self.name, e)
+
+    def status(self):
+        return {
+            "pool_size": self.size,
+            "sessions": len(self._sessions),
+            "idle": len(self._idle),
+            "alive": sum(1 for pooled in self._sessions if pooled.alive),
+            "respawns": self.respawns,
+            "circuit": self.breaker.status(),
+        }
+
+    async def close(self):
+        sessions, self._sessions, self._idle = self._sessions, [], []
+        await asyncio.gather(*(pooled.close() for pooled in sessions), return_exceptions=True)
+
+
+class PoolSessionProxy:
+    """Session stand-in handed to LangChain tools; checks out a pooled session per call"""
+
+    def __init__(self, pool, server_name):
+        self.pool = pool
+        self.server_name = server_name
+
+    async def call_tool(self, name, arguments=None, **kwargs):
+        try:
+            return await self.pool.run(
+                self.server_name,
+                lambda session: session.call_tool(name, arguments, **kwargs),
+                timeout=self.pool.tool_timeout(self.server_name, name),
+            )
+        except McpError:
+            raise
+        except Exception as e:
+            # An error result instead of an exception: the agent is told the
+            # tool is unavailable and can go on without it
+            logger.warning("Tool '%s' of MCP server '%s' failed: %s", name, self.server_name, e)
+            message = f"Tool '{name}' is unavailable: {str(e) or e.__class__.__name__}"
+            return types.CallToolResult(content=[types.TextContent(type="text", text=message)], isError=True)
+
+
+class MCPSessionPool:
+    """Long-lived MCP sessions keyed by server name.
+
+    All methods must be awaited on the same event loop, which has to outlive
+    the requests using the pool. Every call has a deadline; timeouts and
+    crashes count against the server's circuit breaker, and while it is open
+    calls to that server fail at once.
+    """
+
+    def __init__(self, servers, tool_interceptors=None):
+        # Shared with the caller, so servers added later are picked up lazily
+        self.servers = servers
+        # Wrapped around every tool call, first one outermost
+        self.tool_interceptors = list(tool_interceptors or [])
+        self._pools = {}
+        self._health_task = None
+        self._closed = False
+        self._tools_changed_listeners = []
+        self.tool_timeouts = parse_timeouts(TOOL_TIMEOUTS)
+
+    def add_tools_changed_listener(self, callback):
+        """Call callback(server_name) when a server reports tools/list_changed"""
+        self._tools_changed_listeners.append(callback)
+
+    def _notify_tools_changed(self, server_name):
+        for callback in self._tools_changed_listeners:
+            callback(server_name)
+
+    def _get_pool(self, server_name):
+        if self._closed:
+            raise RuntimeError("MCP session pool is closed")
+        if server_name not in self.servers:
+            raise ValueError(f"Unknown MCP server '{server_name}'")
+        config = self.servers[server_name]
+        pool = self._pools.get(server_name)
+        if pool is not None and pool.config != config:
+            # Configuration changed under the same name: drop the old sessions
+            asyncio.create_task(pool.close())
+            pool = None
+        if pool is None:
+            pool = ServerPool(server_name, config, self._notify_tools_changed)
+            self._pools[server_name] = pool
+        return pool
+
+    @asynccontextmanager
+    async def session(self, server_name):
+        """Borrow an initialized ClientSession for server_name"""
+        async with self._get_pool(server_name).checkout() as session:
+            yield session
+
+    def tool_timeout(self, server_name, tool_name):
+        """Deadline of a call to tool_name, from the server config or the global settings"""
+        config = self.servers.get(server_name, {})
+        return (
+            (config.get("tool_timeouts") or {}).get(tool_name)
+            or self.tool_timeouts.get(tool_name)
+            or config.get("call_timeout")
+            or CALL_TIMEOUT
+        )
+
+    def available(self, server_name):
+        """False while the server's circuit is open"""
+        pool = self._pools.get(server_name)
+        return pool is None or pool.breaker.available
+
+    async def _run(self, pool, operation):
+        try:
+            async with pool.checkout() as session:
+                return await operation(session)
+        except anyio.ClosedResourceError:
+            # The server died while idle and the request never left the client,
+            # so it is safe to retry once on a freshly spawned session
+            async with pool.checkout() as session:
+                return await operation(session)
+
+    async def run(self, server_name, operation, timeout=CALL_TIMEOUT):
+        """Await operation(session) on a pooled session of server_name within timeout seconds"""
+        pool = self._get_pool(server_name)
+        pool.breaker.before_call()
+        try:
+            result = await asyncio.wait_for(self._run(pool, operation), timeout or None)
+        except McpError:
+            # The server answered, with an error about the request itself
+            pool.breaker.record_success()
+            raise
+        except asyncio.TimeoutError:
+            # Not the builtin TimeoutError before Python 3.11
+            error = TimeoutError(f"MCP server '{server_name}' did not answer within {timeout}s")
+            pool.breaker.record_failure(error)
+            raise error from None
+        except asyncio.CancelledError:
+            pool.breaker.release()
+            raise
+        except Exception as e:
+            pool.breaker.record_failure(e)
+            raise
+        pool.breaker.record_success()
+        return result
+
+    async def list_tools(self, server_name):
+        """List the MCP tool definitions exposed by server_name"""
+
+        async def list_all(session):
+            tools = []
+            cursor = None
+            while True:
+                result = await session.list_tools(cursor=cursor)
+                tools.extend(result.tools)
+                if not result.nextCursor:
+                    return tools
+                cursor = result.nextCursor
+
+        return await self.run(server_name, list_all, timeout=LIST_TOOLS_TIMEOUT)
+
+    async def get_server_tools(self, server_name):
+        """Get LangChain tools for one server, bound to the pool"""
+        proxy = PoolSessionProxy(self, server_name)
+        return [
+            convert_mcp_tool_to_langchain_tool(
+                proxy, tool, server_name=server_name, tool_interceptors=self.tool_interceptors
+            )
+            for tool in await self.list_tools(server_name)
+        ]
+
+    async def get_tools_by_server(self):
+        """Get LangChain tools for all servers, keyed by server name; failing servers are left out"""
+        names = [name for name in self.servers if self.available(name)]
+        results = await asyncio.gather(*(self.get_server_tools(name) for name in names), return_exceptions=True)
+        return {name: tools for name, tools in zip(names, results) if not isinstance(tools, BaseException)}
+
+    async def get_tools(self):
+        """Get LangChain tools for all servers as a flat list"""
+        tools_by_server = await self.get_tools_by_server()
+        return [tool for tools in tools_by_server.values() for tool in tools]
+
+    async def warm_up(self):
+        """Pre-spawn every configured server"""
+        results = await asyncio.gather(
+            *(self._get_pool(name).warm_up() for name in list(self.servers)),
+            return_exceptions=True,
+        )
+        for name, result in zip(list(self.servers), results):
+            if isinstance(result, Exception):
+                logger.error("Error warming up MCP server '%s': %s", name, result)
+                self._get_pool(name).breaker.record_failure(result)
+
+    def start_health_checks(self, interval=HEALTH_CHECK_INTERVAL):
+        """Periodically ping idle sessions on the running loop"""
+        if self._health_task is None and interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop(interval))
+
+    async def _health_loop(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            for pool in list(self._pools.values()):
+                if pool.breaker.retry_due:
+                    # Probe servers whose circuit is open, so they recover without traffic
+                    try:
+                        await self.run(pool.name, lambda session: session.send_ping(), timeout=PING_TIMEOUT)
+                    except Exception as e:
+                        logger.info("MCP server '%s' still unavailable: %s", pool.name, e)
+                    continue
+                try:
+                    await pool.health_check()
+                except Exception:
+                    logger.exception("Error in health check for '%s'", pool.name)
+
+    def status(self):
+        return {name: pool.status() for name, pool in self._pools.items()}
+
+    async def close(self):
+        """Close all sessions and terminate the server processes"""
+        self._closed = True
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        pools, self._pools = self._pools, {}
+        await asyncio.gather(*(pool.close() for pool in pools.values()), return_exceptions=True)
@@ -1,67 +1,282 @@
 # mysql_mcp_server.py
+import asyncio
+import csv
+import io
+import json
+import os
+import time
+from contextlib import asynccontextmanager
 from mcp.server.fastmcp import FastMCP
 from datetime import datetime
 
-mcp = FastMCP("Mysql")
+from mcp_server_runner import run_server
+from mysql_backend import (
+    BULK_BATCH_SIZE,
+    MAX_ROWS,
+    MYSQL_URL,
+    create_backend,
+    decode_page_token,
+    encode_page_token,
+    quote_identifier,
+)
+
+_backend = None
+_backend_lock = asyncio.Lock()
+
+
+async def get_backend():
+    """Get the connection pool, opening it on first use"""
+    global _backend
+    async with _backend_lock:
+        if _backend is None:
+            backend = create_backend(MYSQL_URL)
+            await backend.start()
+            _backend = backend
+        return _backend
+
+
+@asynccontextmanager
+async def lifespan(server):
+    try:
+        yield
+    finally:
+        if _backend is not None:
+            await _backend.close()
+
+
+mcp = FastMCP("Mysql", lifespan=lifespan, log_level=os.getenv("LOG_LEVEL", "INFO").upper())
+
+
+def _identifiers(backend, names):
+    """Quote a comma-separated list of identifiers"""
+    return [quote_identifier(name, backend.identifier_quote) for name in names.split(",") if name.strip()]
+
+
+def _parse_values(values):
+    """Parse a JSON array, or a comma-separated list with SQL-style 'quotes'"""
+    values = values.strip()
+    if values.startswith("["):
+        return json.loads(values)
+    row = next(csv.reader([values], quotechar="'", skipinitialspace=True), [])
+    return [None if value.upper() == "NULL" else value for value in row]
+
+
+def _pairs(backend, columns, values):
+    names = _identifiers(backend, columns)
+    params = _parse_values(values)
+    if len(names) != len(params):
+        raise ValueError(f"Got {len(names)} columns but {len(params)} values")
+    return names, params
+
+
+async def _run_query(sql, params, max_rows, page_token):
+    """Run a statement and return JSON, paging result sets"""
+    backend = await get_backend()
+    max_rows = max(1, min(max_rows, MAX_ROWS))
+    offset = decode_page_token(page_token, sql, params)
+    result = await backend.run(sql, params, max_rows=max_rows, offset=offset)
+    if "columns" not in result:
+        return json.dumps(result)
+    has_more = result.pop("has_more")
+    result["row_count"] = len(result["rows"])
+    result["next_page_token"] = encode_page_token(sql, params, offset + max_rows) if has_more else None
+    return json.dumps(result, default=str)
+
 
 #mysql tool
 @mcp.tool()
-def mysql_query(query: str) -> str:
-    """Query a mysql database"""
-    return "Query executed successfully"
+async def mysql_query(query: str, params: list | None = None, max_rows: int = MAX_ROWS, page_token: str = "") -> str:
+    """Run a SQL statement on the mysql database.
+
+    Use %s placeholders and pass their values in params instead of quoting
+    values into the query. Result sets return at most max_rows rows as JSON
+    {columns, rows, row_count, next_page_token}; call again with the same
+    query, params and next_page_token to get the next page. Other statements
+    return rows_affected and last_insert_id.
+    """
+    return await _run_query(query, params, max_rows, page_token)
 
 #mysql create table tool
-@mcp.tool() 
-def mysql_create_table(table_name: str, columns: str) -> str:
-    """Create a mysql table"""
-    return "Table created successfully"
+@mcp.tool()
+async def mysql_create_table(table_name: str, columns: str) -> str:
+    """Create a mysql table; columns are column definitions, e.g. "id INT PRIMARY KEY, name VARCHAR(50)" """
+    backend = await get_backend()
+    await backend.run(f"CREATE TABLE {quote_identifier(table_name, backend.identifier_quote)} ({columns})")
+    return f"Table {table_name} created successfully"
 
 #mysql insert tool
 @mcp.tool()
-def mysql_insert(table_name: str, columns: str, values: str) -> str:
-    """Insert a mysql table"""
-    return "Table created successfully"
+async def mysql_insert(table_name: str, columns: str, values: str) -> str:
+    """Insert a row into a mysql table.
+
+    columns is a comma-separated list of column names, values a JSON array
+    (or comma-separated list) with one value per column.
+    """
+    backend = await get_backend()
+    names, params = _pairs(backend, columns, values)
+    sql = (
+        f"INSERT INTO {quote_identifier(table_name, backend.identifier_quote)} "
+        f"({', '.join(names)}) VALUES ({', '.join(['%s'] * len(names))})"
+    )
+    return json.dumps(await backend.run(sql, params))
+
+def _parse_rows(columns, rows):
+    """Parse a JSON array of arrays/objects or CSV text into (column names, rows)"""
+    names = [name.strip() for name in columns.split(",") if name.strip()]
+    text = rows.strip()
+    if text.startswith("["):
+        parsed = json.loads(text)
+        if parsed and isinstance(parsed[0], dict):
+            names = names or list(parsed[0])
+            return names, [[row.get(name) for name in names] for row in parsed]
+        return names, [list(row) for row in parsed]
+    reader = csv.reader(io.StringIO(text), skipinitialspace=True)
+    if not names:
+        # Without columns the first CSV line is the header
+        names = [name.strip() for name in next(reader, [])]
+    return names, [[None if value == "NULL" else value for value in row] for row in reader if row]
+
+
+#mysql bulk insert tool
+@mcp.tool()
+async def mysql_bulk_insert(table_name: str, rows: str, columns: str = "", batch_size: int = BULK_BATCH_SIZE) -> str:
+    """Insert many rows into a mysql table in one transaction.
+
+    rows is a JSON array of arrays (or of objects keyed by column name), or
+    CSV text. columns is a comma-separated list of column names; it can be
+    omitted for JSON objects or when the first CSV line is a header. Rows are
+    sent batch_size at a time; if any row fails nothing is inserted.
+    """
+    started = time.perf_counter()
+    backend = await get_backend()
+    names, parsed = _parse_rows(columns, rows)
+    if not names:
+        raise ValueError("No columns given")
+    for number, row in enumerate(parsed, 1):
+        if len(row) != len(names):
+            raise ValueError(f"Row {number} has {len(row)} values but there are {len(names)} columns")
+    quoted = [quote_identifier(name, backend.identifier_quote) for name in names]
+    sql = (
+        f"INSERT INTO {quote_identifier(table_name, backend.identifier_quote)} "
+        f"({', '.join(quoted)}) VALUES ({', '.join(['%s'] * len(quoted))})"
+    )
+    result = await backend.executemany(sql, parsed, max(1, batch_size))
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return json.dumps(result)
+
+#mysql transaction tool
+@mcp.tool()
+async def mysql_transaction(statements: list) -> str:
+    """Run several SQL statements atomically: all of them are committed, or none.
+
+    Each statement is a SQL string or an object {"sql": ..., "params": [...]}
+    using %s placeholders. Returns the result of each statement, the total
+    rows affected and the elapsed time. Note that MySQL commits implicitly
+    on DDL statements such as CREATE TABLE.
+    """
+    started = time.perf_counter()
+    backend = await get_backend()
+    pairs = []
+    for statement in statements:
+        if isinstance(statement, str):
+            pairs.append((statement, None))
+        else:
+            pairs.append((statement["sql"], statement.get("params")))
+    results = await backend.transaction(pairs)
+    return json.dumps({
+        "results": results,
+        "rows_affected": sum(max(result.get("rows_affected", 0), 0) for result in results),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }, default=str)
 
 #mysql update tool
 @mcp.tool()
-def mysql_update(table_name: str, columns: str, values: str) -> str:
-    """Update a mysql table"""
-    return "Table updated successfully"
+async def mysql_update(table_name: str, columns: str, values: str, where: str, where_params: list | None = None) -> str:
+    """Update rows of a mysql table.
+
+    Sets each of the comma-separated columns to the matching value (JSON
+    array or comma-separated list) on the rows matching the where condition,
+    which may use %s placeholders bound to where_params. Use where "1=1" to
+    update every row.
+    """
+    if not where.strip():
+        raise ValueError('where is required; use "1=1" to update every row')
+    backend = await get_backend()
+    names, params = _pairs(backend, columns, values)
+    sql = (
+        f"UPDATE {quote_identifier(table_name, backend.identifier_quote)} "
+        f"SET {', '.join(f'{name} = %s' for name in names)} WHERE {where}"
+    )
+    return json.dumps(await backend.run(sql, params + list(where_params or [])))
 
 #mysql delete tool
 @mcp.tool()
-def mysql_delete(table_name: str, columns: str, values: str) -> str:
-    """Delete a mysql table"""
-    return "Table deleted successfully"
+async def mysql_delete(table_name: str, columns: str, values: str) -> str:
+    """Delete the rows of a mysql table where every one of the comma-separated columns equals its value"""
+    backend = await get_backend()
+    names, params = _pairs(backend, columns, values)
+    if not names:
+        raise ValueError("At least one column is required")
+    sql = (
+        f"DELETE FROM {quote_identifier(table_name, backend.identifier_quote)} "
+        f"WHERE {' AND '.join(f'{name} = %s' for name in names)}"
+    )
+    return json.dumps(await backend.run(sql, params))
 
 
 #mysql select tool
 @mcp.tool()
-def mysql_select(table_name: str, columns: str, values: str) -> str:
-    """Select a mysql table"""
-    return "Table selected successfully"
+async def mysql_select(
+    table_name: str,
+    columns: str = "*",
+    where: str = "",
+    params: list | None = None,
+    order_by: str = "",
+    max_rows: int = MAX_ROWS,
+    page_token: str = "",
+) -> str:
+    """Select rows from a mysql table.
+
+    columns is a comma-separated list of column names ("*" for all); where is
+    an optional condition using %s placeholders bound to params; order_by a
+    comma-separated list of column names. Returns at most max_rows rows as
+    JSON; pass back next_page_token to get the next page.
+    """
+    backend = await get_backend()
+    selected = "*" if columns.strip() in ("", "*") else ", ".join(_identifiers(backend, columns))
+    sql = f"SELECT {selected} FROM {quote_identifier(table_name, backend.identifier_quote)}"
+    if where.strip():
+        sql += f" WHERE {where}"
+    if order_by.strip():
+        sql += f" ORDER BY {', '.join(_identifiers(backend, order_by))}"
+    return await _run_query(sql, params, max_rows, page_token)
 
 
 #mysql create database tool
 @mcp.tool()
-def mysql_create_database(database_name: str) -> str:
+async def mysql_create_database(database_name: str) -> str:
     """Create a mysql database"""
-    return "Database created successfully"
+    backend = await get_backend()
+    await backend.create_database(database_name)
+    return f"Database {database_name} created successfully"
 
 
 #mysql delete database tool
 @mcp.tool()
-def mysql_delete_database(database_name: str) -> str:
+async def mysql_delete_database(database_name: str) -> str:
     """Delete a mysql database"""
-    return "Database deleted successfully"
+    backend = await get_backend()
+    await backend.drop_database(database_name)
+    return f"Database {database_name} deleted successfully"
 
 
 #mysql show databases tool
 @mcp.tool()
-def mysql_show_databases() -> str:
+async def mysql_show_databases() -> str:
     """Show all mysql databases"""
-    return "Databases shown successfully"
+    backend = await get_backend()
+    return json.dumps(await backend.list_databases())
 
 if __name__ == "__main__":
-    print("Starting mysql mcp server")
-    mcp.run(transport="stdio")
\ No newline at end of file
+    # stdio by default; --transport streamable-http or sse runs it as a service
+    run_server(mcp, "mysql", default_port=8001)
@@ -1,5 +1,6 @@
 import os
 import asyncio
+import time
 from dotenv import load_dotenv
 from langchain_ollama.chat_models import ChatOllama
 from langchain_core.messages import HumanMessage, SystemMessage
@@ -26,6 +27,7 @@ class OllamaChat:
                 base_url=self.base_url,
                 temperature=0.7,
                 top_p=0.9,
+                keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),  # Tiene il modello in memoria tra le domande
                 #num_predict=256,  # Limite di token per la risposta
                 verbose=True
             )
@@ -81,6 +83,19 @@ class OllamaChat:
         except Exception as e:
             return f"Errore: {e}"
 
+    def batch_chat(self, messages):
+        """Invia più domande insieme, tante in parallelo quante ne gestisce Ollama"""
+        max_concurrency = int(os.getenv("OLLAMA_NUM_PARALLEL", "2"))
+        responses = asyncio.run(self.chat_model.abatch(
+            [[HumanMessage(content=message)] for message in messages],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        ))
+        return [
+            f"Errore: {response}" if isinstance(response, Exception) else response.content
+            for response in responses
+        ]
+
     def chat_with_system_prompt(self, message, system_prompt="Sei un assistente AI utile e cordiale."):
         """Chat con system prompt personalizzato"""
         try:
@@ -255,11 +270,14 @@ def batch_test():
         "Risolvi questa equazione: 2x + 5 = 15"
     ]
 
-    for i, question in enumerate(test_questions, 1):
+    # Le domande sono inviate tutte insieme; Ollama le elabora in parallelo
+    start = time.perf_counter()
+    responses = chat.batch_chat(test_questions)
+    for i, (question, response) in enumerate(zip(test_questions, responses), 1):
         print(f"\n--- Domanda {i}: {question} ---")
-        response = chat.simple_chat(question)
         print(f"Risposta: {response}")
         print("-" * 50)
+    print(f"\n{len(test_questions)} domande in {time.perf_counter() - start:.1f}s")
 
 
 def main():
@@ -0,0 +1,275 @@
+# ollama_pool.py
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+from langchain_core.language_models import BaseChatModel
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_ollama.chat_models import ChatOllama
+from pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated Ollama servers, each optionally with its own number of
+# parallel requests ("http://gpu1:11434=4,http://gpu2:11434")
+OLLAMA_BASE_URLS = os.getenv("OLLAMA_BASE_URLS", os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"))
+# Requests a server processes at once; match the server's OLLAMA_NUM_PARALLEL
+OLLAMA_NUM_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL", "2"))
+# How long a server keeps the model loaded after a request ("-1" forever)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Context window of every request; a request with another size makes Ollama
+# reload the model and drop its cached prompt prefixes (unset: server default)
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "0")) or None
+# Identical requests in flight at the same time share one model call
+OLLAMA_COALESCE = os.getenv("OLLAMA_COALESCE", "true").lower() in ("1", "true", "yes")
+# Seconds a server that refused a connection is only used as a last resort
+OLLAMA_RETRY_AFTER = float(os.getenv("OLLAMA_RETRY_AFTER", "30"))
+
+# Raised before a request reached the server, so another one can take it
+CONNECT_ERRORS = (ConnectionError, httpx.ConnectError, httpx.ConnectTimeout)
+
+
+def parse_backends(value, default_parallel=OLLAMA_NUM_PARALLEL):
+    """Parse "url=parallel,url" settings into (url, parallel) pairs"""
+    backends = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        url, _, parallel = item.rpartition("=") if "=" in item else (item, "", "")
+        backends.append((url.strip().rstrip("/"), int(parallel) if parallel else default_parallel))
+    return backends
+
+
+def affinity_key(messages):
+    """Hash of the start of a conversation; its later turns share that prompt prefix"""
+    head = [[msg.type, msg.content] for msg in messages[:2]]
+    return int(hashlib.sha256(json.dumps(head, default=str).encode()).hexdigest()[:8], 16)
+
+
+def request_key(messages, stop, kwargs):
+    """Fingerprint of a model request; message ids and provider metadata do not count"""
+    payload = {
+        "messages": [
+            [msg.type, msg.content, getattr(msg, "tool_calls", None), getattr(msg, "tool_call_id", None)]
+            for msg in messages
+        ],
+        "stop": stop,
+        "kwargs": kwargs,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class OllamaBackend:
+    """One Ollama server and the slots it has for parallel requests"""
+
+    def __init__(self, url, parallel, client):
+        self.url = url
+        self.parallel = max(1, parallel)
+        self.client = client
+        self.in_flight = 0
+        self.waiting = 0
+        self.requests = 0
+        self.errors = 0
+        self.down_until = 0.0
+        # Created on first use, inside the event loop
+        self._semaphore = None
+
+    @property
+    def load(self):
+        return (self.in_flight + self.waiting) / self.parallel
+
+    @property
+    def has_free_slot(self):
+        return self.in_flight + self.waiting < self.parallel
+
+    @property
+    def available(self):
+        return time.monotonic() >= self.down_until
+
+    def mark_down(self, error):
+        self.errors += 1
+        self.down_until = time.monotonic() + OLLAMA_RETRY_AFTER
+        logger.warning("Ollama server %s unreachable, skipping it for %ss: %s", self.url, OLLAMA_RETRY_AFTER, error)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.parallel)
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self.requests += 1
+        try:
+            yield self.client
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def status(self):
+        return {
+            "url": self.url,
+            "parallel": self.parallel,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "requests": self.requests,
+            "errors": self.errors,
+            "available": self.available,
+        }
+
+
+class PooledChatOllama(BaseChatModel):
+    """Chat model spreading requests over one or more Ollama servers.
+
+    Each server takes as many requests at once as it runs in parallel; the
+    rest wait for a slot on the least loaded server. A server that refuses
+    connections is skipped for a while and its requests go to the others.
+    Ollama has no multi-prompt endpoint, so concurrent calls are batched on
+    the server side by its parallel slots, and identical calls in flight at
+    the same time are coalesced into one. Turns of the same conversation go
+    to the same server while it has a free slot, so it can reuse the prompt
+    prefix it already processed.
+    """
+
+    model: str
+    base_urls: str = OLLAMA_BASE_URLS
+    num_parallel: int = OLLAMA_NUM_PARALLEL
+    keep_alive: str | int | None = OLLAMA_KEEP_ALIVE
+    num_ctx: int | None = OLLAMA_NUM_CTX
+    coalesce: bool = OLLAMA_COALESCE
+    temperature: float | None = None
+    top_p: float | None = None
+
+    _backends: list = PrivateAttr(default_factory=list)
+    _in_flight: dict = PrivateAttr(default_factory=dict)
+    _coalesced: int = PrivateAttr(default=0)
+
+    def model_post_init(self, __context):
+        self._backends = [
+            OllamaBackend(url, parallel, ChatOllama(
+                model=self.model,
+                base_url=url,
+                keep_alive=self.keep_alive,
+                num_ctx=self.num_ctx,
+                temperature=self.temperature,
+                top_p=self.top_p,
+            ))
+            for url, parallel in parse_backends(self.base_urls, self.num_parallel)
+        ]
+        if not self._backends:
+            raise ValueError("No Ollama server configured")
+
+    @property
+    def _llm_type(self):
+        return "ollama-pool"
+
+    @property
+    def _identifying_params(self):
+        return {"model": self.model, "base_urls": self.base_urls}
+
+    @property
+    def capacity(self):
+        """Requests the servers process at once, all together"""
+        return sum(backend.parallel for backend in self._backends)
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        return super().bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _pick(self, tried, affinity=None):
+        candidates = [b for b in self._backends if b not in tried]
+        # Servers marked down are only used when every other one failed too
+        available = [b for b in candidates if b.available] or candidates
+        if affinity is not None:
+            preferred = self._backends[affinity % len(self._backends)]
+            if preferred in available and preferred.has_free_slot:
+                return preferred
+        return min(available, key=lambda b: (b.load, b.requests))
+
+    async def _dispatch(self, messages, stop, run_manager, kwargs):
+        tried = []
+        affinity = affinity_key(messages)
+        while True:
+            backend = self._pick(tried, affinity)
+            try:
+                async with backend.slot() as client:
+                    return await client._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except CONNECT_ERRORS as e:
+                backend.mark_down(e)
+                tried.append(backend)
+                if len(tried) == len(self._backends):
+                    raise
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if not self.coalesce:
+            return await self._dispatch(messages, stop, run_manager, kwargs)
+        key = request_key(messages, stop, kwargs)
+        shared = self._in_flight.get(key)
+        if shared is None:
+            task = asyncio.ensure_future(self._dispatch(messages, stop, run_manager, kwargs))
+            shared = self._in_flight[key] = {"task": task, "waiters": 0}
+            task.add_done_callback(lambda _task: self._in_flight.pop(key, None))
+            first = True
+        else:
+            self._coalesced += 1
+            first = False
+        shared["waiters"] += 1
+        try:
+            result = await asyncio.shield(shared["task"])
+        except asyncio.CancelledError:
+            # The call is only cancelled once nobody is waiting for it any more
+            shared["waiters"] -= 1
+            if shared["waiters"] == 0:
+                shared["task"].cancel()
+            raise
+        shared["waiters"] -= 1
+        # Callers get their own copy, since LangChain fills in message ids
+        return result if first else result.model_copy(deep=True)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        tried = []
+        affinity = affinity_key(messages)
+        while True:
+            backend = self._pick(tried, affinity)
+            started = False
+            try:
+                async with backend.slot() as client:
+                    async for chunk in client._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                        started = True
+                        yield chunk
+                return
+            except CONNECT_ERRORS as e:
+                # Tokens already sent cannot be taken back; only retry before the first one
+                backend.mark_down(e)
+                tried.append(backend)
+                if started or len(tried) == len(self._backends):
+                    raise
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        # Synchronous calls bypass the slots, which belong to the event loop
+        return self._pick([]).client._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def abatch(self, inputs, config=None, *, return_exceptions=False, **kwargs):
+        """Run several prompts at once, by default as many as the servers take in parallel"""
+        if config is None or isinstance(config, dict) and "max_concurrency" not in config:
+            config = {**(config or {}), "max_concurrency": self.capacity}
+        return await super().abatch(inputs, config, return_exceptions=return_exceptions, **kwargs)
+
+    async def warm_up(self, prompt="Reply with OK."):
+        """Send a short prompt to every server, so each of them loads the model"""
+        await asyncio.gather(*(backend.client.ainvoke(prompt) for backend in self._backends))
+
+    def status(self):
+        return {
+            "model": self.model,
+            "capacity": self.capacity,
+            "coalesced": self._coalesced,
+            "servers": [backend.status() for backend in self._backends],
+        }
@@ -0,0 +1,222 @@
+# response_cache.py
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_PATH = os.getenv(
+    "RESPONSE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "response_cache.sqlite3"),
+)
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+# "exact" matches normalized queries only, "semantic" also matches similar ones
+RESPONSE_CACHE_MODE = os.getenv("RESPONSE_CACHE_MODE", "exact").lower()
+RESPONSE_CACHE_EMBED_MODEL = os.getenv("RESPONSE_CACHE_EMBED_MODEL", "nomic-embed-text")
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    response TEXT NOT NULL,
+    embedding TEXT,
+    created_at REAL NOT NULL,
+    last_hit REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope);
+CREATE INDEX IF NOT EXISTS responses_last_hit ON responses (last_hit);
+"""
+
+
+def normalize_query(query):
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return re.sub(r"\s+", " ", query).strip().lower().rstrip("?!. ")
+
+
+def cosine_similarity(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class ResponseCache:
+    """SQLite-backed cache of final agent responses.
+
+    Entries are scoped by model id and tool-catalog fingerprint, so changing
+    the model or the tool set never serves an answer produced by the old one.
+    In "semantic" mode queries are also embedded with a local Ollama model and
+    matched by cosine similarity against the entries of the same scope.
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, ttl=RESPONSE_CACHE_TTL,
+                 max_entries=RESPONSE_CACHE_MAX_ENTRIES, mode=RESPONSE_CACHE_MODE,
+                 similarity=RESPONSE_CACHE_SIMILARITY, embeddings=None):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.mode = mode
+        self.similarity = similarity
+        self._embeddings = embeddings
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        # In-memory vector index per scope: {scope: {key: embedding}}
+        self._vectors = {}
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def scope(model_id, catalog_fingerprint):
+        return f"{model_id}|{catalog_fingerprint}"
+
+    @staticmethod
+    def key(query, scope):
+        return hashlib.sha256(f"{scope}\n{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    def _get_embeddings(self):
+        if self._embeddings is None:
+            from langchain_ollama import OllamaEmbeddings
+            self._embeddings = OllamaEmbeddings(model=RESPONSE_CACHE_EMBED_MODEL)
+        return self._embeddings
+
+    async def _embed(self, query):
+        try:
+            return await self._get_embeddings().aembed_query(normalize_query(query))
+        except Exception as e:
+            logger.warning("Error embedding query for the response cache: %s", e)
+            return None
+
+    def _load_vectors(self, scope):
+        if scope not in self._vectors:
+            rows = self._conn.execute(
+                "SELECT key, embedding FROM responses WHERE scope = ? AND embedding IS NOT NULL",
+                (scope,),
+            ).fetchall()
+            self._vectors[scope] = {key: json.loads(embedding) for key, embedding in rows}
+        return self._vectors[scope]
+
+    def _nearest(self, scope, embedding):
+        with self._lock:
+            vectors = dict(self._load_vectors(scope))
+        best_key, best_score = None, 0.0
+        for key, vector in vectors.items():
+            score = cosine_similarity(embedding, vector)
+            if score > best_score:
+                best_key, best_score = key, score
+        return best_key if best_score >= self.similarity else None
+
+    def _fetch(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            if self.ttl and time.time() - created_at > self.ttl:
+                self._delete(key)
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_hit = ?, hits = hits + 1 WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            return json.loads(response)
+
+    def _delete(self, key):
+        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self._conn.commit()
+        for vectors in self._vectors.values():
+            vectors.pop(key, None)
+
+    def _store(self, key, query, scope, response, embedding):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, query, scope, response, embedding, created_at, last_hit) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, query, scope, json.dumps(response, default=str),
+                 json.dumps(embedding) if embedding is not None else None, now, now),
+            )
+            if embedding is not None:
+                self._load_vectors(scope)[key] = embedding
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self.ttl:
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT key FROM responses WHERE created_at < ?", (time.time() - self.ttl,)
+            )]
+            for key in expired:
+                self._delete(key)
+        overflow = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            # Least recently hit entries go first
+            stale = [row[0] for row in self._conn.execute(
+                "SELECT key FROM responses ORDER BY last_hit LIMIT ?", (overflow,)
+            )]
+            for key in stale:
+                self._delete(key)
+
+    async def get(self, query, model_id, catalog_fingerprint):
+        """Return the cached response for query, or None"""
+        scope = self.scope(model_id, catalog_fingerprint)
+        response = await asyncio.to_thread(self._fetch, self.key(query, scope))
+        if response is not None:
+            self.hits += 1
+            return response
+
+        if self.mode == "semantic":
+            embedding = await self._embed(query)
+            if embedding is not None:
+                key = await asyncio.to_thread(self._nearest, scope, embedding)
+                if key is not None:
+                    response = await asyncio.to_thread(self._fetch, key)
+                    if response is not None:
+                        self.semantic_hits += 1
+                        return response
+
+        self.misses += 1
+        return None
+
+    async def put(self, query, model_id, catalog_fingerprint, response):
+        """Store the response produced for query"""
+        scope = self.scope(model_id, catalog_fingerprint)
+        embedding = await self._embed(query) if self.mode == "semantic" else None
+        await asyncio.to_thread(
+            self._store, self.key(query, scope), query, scope, response, embedding
+        )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._vectors.clear()
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "mode": self.mode,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,95 @@
+# server_registry.py
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Shared by every worker process, so a server added through one worker is
+# seen by all of them
+SERVER_REGISTRY_PATH = os.getenv(
+    "SERVER_REGISTRY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "servers.sqlite3"),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS servers (
+    name TEXT PRIMARY KEY,
+    config TEXT NOT NULL,
+    builtin INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class ServerExists(Exception):
+    pass
+
+
+class ServerRegistry:
+    """MCP server configurations stored in SQLite.
+
+    Each process keeps its own dict of servers (the one the session pool
+    reads) and brings it up to date with sync(), which only reloads the
+    table when another connection has written to it.
+    """
+
+    def __init__(self, path=SERVER_REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._data_version = None
+
+    def seed(self, builtin_servers):
+        """Store the servers defined in code, replacing older copies of them"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO servers (name, config, builtin, updated_at) VALUES (?, ?, 1, ?)",
+                [(name, json.dumps(config), now) for name, config in builtin_servers.items()],
+            )
+            self._conn.commit()
+
+    def load(self):
+        """All servers, keyed by name"""
+        with self._lock:
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            rows = self._conn.execute("SELECT name, config FROM servers ORDER BY builtin DESC, name").fetchall()
+        return {name: json.loads(config) for name, config in rows}
+
+    def add(self, name, config):
+        """Store a new server; raises ServerExists if the name is taken"""
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO servers (name, config, builtin, updated_at) VALUES (?, ?, 0, ?)",
+                    (name, json.dumps(config), time.time()),
+                )
+                self._conn.commit()
+        except sqlite3.IntegrityError:
+            raise ServerExists(f"Server '{name}' already exists")
+
+    def last_modified(self):
+        """Time of the latest change to the stored servers"""
+        with self._lock:
+            return self._conn.execute("SELECT MAX(updated_at) FROM servers").fetchone()[0]
+
+    def changed(self):
+        """Whether another connection wrote to the registry since the last load"""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0] != self._data_version
+
+    def sync(self, servers):
+        """Update servers in place from the registry; returns the names that changed"""
+        if not self.changed():
+            return set()
+        current = self.load()
+        changed = {name for name in set(servers) | set(current) if servers.get(name) != current.get(name)}
+        for name in changed:
+            if name in current:
+                servers[name] = current[name]
+            else:
+                servers.pop(name, None)
+        return changed
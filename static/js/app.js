@@ -0,0 +1,1015 @@
+// DOM Elements
+const messageForm = document.getElementById('messageForm');
+const userInput = document.getElementById('userInput');
+const chatMessages = document.getElementById('chatMessages');
+const newChatBtn = document.getElementById('newChatBtn');
+const serversContainer = document.getElementById('servers-container');
+const toolsModalOverlay = document.getElementById('toolsModalOverlay');
+const toolsModalBody = document.getElementById('toolsModalBody');
+const closeToolsModal = document.getElementById('closeToolsModal');
+const closeModalBtn = document.getElementById('closeModalBtn');
+const addServerBtn = document.getElementById('addServerBtn');
+const addServerModalOverlay = document.getElementById('addServerModalOverlay');
+const closeAddServerModal = document.getElementById('closeAddServerModal');
+const closeAddServerBtn = document.getElementById('closeAddServerBtn');
+
+// Modal Functions
+function showToolsModal(serverId, serverName) {
+    // Set modal title
+    document.querySelector('.tools-modal-title').innerHTML = `<i class="fas fa-wrench"></i>${serverName} Tools`;
+
+    // Load tools into modal
+    toolsModalBody.innerHTML = '<div class="loading-spinner"><i class="fas fa-circle-notch fa-spin"></i> Loading tools...</div>';
+
+    // Show modal
+    toolsModalOverlay.style.display = 'flex';
+
+    // Fetch tools for this server
+    fetch('/api/tools')
+        .then(response => response.json())
+        .then(tools => {
+            console.log("All tools:", tools);
+
+            // Filter tools for this server
+            const serverTools = tools.filter(tool => {
+                if (tool.server) {
+                    return tool.server === serverId;
+                } else {
+                    // Fallback server assignment based on tool name
+                    if (serverId === 'mysql') {
+                        return tool.name.toLowerCase().includes('sql') || 
+                            tool.name.toLowerCase().includes('database') ||
+                            tool.name.toLowerCase().includes('query');
+                    } else if (serverId === 'file') {
+                        return tool.name.toLowerCase().includes('file') || 
+                            tool.name.toLowerCase().includes('read') || 
+                            tool.name.toLowerCase().includes('write') ||
+                            tool.name.toLowerCase().includes('list');
+                    }
+                    return false;
+                }
+            });
+
+            console.log(`Tools for ${serverId}:`, serverTools);
+
+            if (serverTools.length > 0) {
+                let toolsHTML = '';
+                serverTools.forEach(tool => {
+                    const description = tool.description || "No description available";
+                    toolsHTML += `
+                        <div class="server-tool-item">
+                            <div class="server-tool-name">
+                                <i class="fas fa-wrench"></i>${tool.name}
+                            </div>
+                            <div class="server-tool-description">${description}</div>
+                        </div>
+                    `;
+                });
+                toolsModalBody.innerHTML = toolsHTML;
+            } else {
+                toolsModalBody.innerHTML = '<div class="no-tools">No tools available for this server</div>';
+            }
+        })
+        .catch(error => {
+            console.error('Error fetching tools:', error);
+            toolsModalBody.innerHTML = '<div class="error-message">Failed to load tools</div>';
+        });
+}
+
+function hideToolsModal() {
+    toolsModalOverlay.style.display = 'none';
+}
+
+// Modal event listeners
+closeToolsModal.addEventListener('click', hideToolsModal);
+closeModalBtn.addEventListener('click', hideToolsModal);
+toolsModalOverlay.addEventListener('click', function(e) {
+    if (e.target === toolsModalOverlay) {
+        hideToolsModal();
+    }
+});
+
+// Toggle server section
+document.addEventListener('click', function(e) {
+    if (e.target.closest('.server-header') || e.target.closest('.toggle-icon')) {
+        const header = e.target.closest('.server-header') || e.target.closest('.toggle-icon').parentNode;
+        const content = header.nextElementSibling;
+        content.classList.toggle('expanded');
+        header.querySelector('.toggle-icon').classList.toggle('collapsed');
+    }
+});
+
+// Tool popover management
+let activePopover = null;
+
+function closeAllPopovers() {
+    document.querySelectorAll('.tool-popover').forEach(popover => {
+        popover.classList.remove('show');
+    });
+    activePopover = null;
+}
+
+document.addEventListener('click', (e) => {
+    if (!e.target.closest('.tool-badge') && !e.target.closest('.tool-popover')) {
+        closeAllPopovers();
+    }
+});
+
+// Load servers and tools via AJAX
+function loadServers() {
+    fetch('/api/servers')
+        .then(response => response.json())
+        .then(data => {
+            serversContainer.innerHTML = '';
+            console.log(data);
+
+            // Handle the server response format
+            const serverArray = Object.entries(data).map(([name, details]) => ({
+                id: name,
+                name: name.charAt(0).toUpperCase() + name.slice(1), // Capitalize first letter
+                type: "Python",
+                command: details.command,
+                url: details.url,
+                transport: details.transport || "stdio",
+                args: details.args || []
+            }));
+
+            if (serverArray.length > 0) {
+                serverArray.forEach((server, index) => {
+                    const serverElement = createServerElement(server);
+                    serversContainer.appendChild(serverElement);
+
+                    // Expand the first server by default
+                    if (index === 0) {
+                        const content = serverElement.querySelector('.server-content');
+                        const toggleIcon = serverElement.querySelector('.toggle-icon');
+                        content.classList.add('expanded');
+                        toggleIcon.classList.remove('collapsed');
+                    }
+                });
+
+                // Enable the input field automatically
+                userInput.disabled = false;
+                userInput.placeholder = "Type your message...";
+                userInput.focus();
+
+                // Show connected status
+                document.querySelector('.server-info').textContent = `${serverArray.length} servers available`;
+            } else {
+                serversContainer.innerHTML = '<div class="no-servers">No MCP servers available</div>';
+            }
+        })
+        .catch(error => {
+            console.error('Error loading servers:', error);
+            serversContainer.innerHTML = '<div class="error-message">Failed to load servers</div>';
+        });
+}
+
+// Function to create server element with collapsible details
+function createServerElement(server) {
+    const serverElement = document.createElement('div');
+    serverElement.className = 'server-details';
+    serverElement.dataset.serverId = server.id;
+
+    // Set icon based on server type
+    let iconClass = 'fa-server';
+    if (server.id === 'mysql') {
+        iconClass = 'fa-database';
+    } else if (server.id === 'file') {
+        iconClass = 'fa-file-alt';
+    }
+
+    // Create server header
+    const serverHeader = document.createElement('div');
+    serverHeader.className = 'server-header';
+    serverHeader.innerHTML = `
+        <h6><i class="fas ${iconClass}"></i>${server.name} MCP Server</h6>
+        <i class="fas fa-chevron-down toggle-icon collapsed"></i>
+    `;
+
+    // Create server info content
+    const serverContent = document.createElement('div');
+    serverContent.className = 'server-content';
+
+    // Add server details
+    const serverInfo = document.createElement('div');
+    serverInfo.className = 'server-info-details';
+
+    let serverDetailsHTML = `
+        <div class="detail-item">
+            <span class="detail-label">Type:</span>
+            <span class="detail-value">${server.type}</span>
+        </div>
+        <div class="detail-item">
+            <span class="detail-label">${server.url ? 'URL' : 'Command'}:</span>
+            <span class="detail-value">${server.url || server.command}</span>
+        </div>
+        <div class="detail-item">
+            <span class="detail-label">Transport:</span>
+            <span class="detail-value">${server.transport}</span>
+        </div>
+    `;
+
+    if (server.args && server.args.length > 0) {
+        serverDetailsHTML += `
+            <div class="detail-item">
+                <span class="detail-label">Script:</span>
+                <span class="detail-value">${server.args[0].split('/').pop()}</span>
+            </div>
+        `;
+    }
+
+    // Add View Tools button
+    serverDetailsHTML += `
+        <button class="view-tools-btn" data-server-id="${server.id}" data-server-name="${server.name}">
+            <i class="fas fa-tools"></i> View Tools
+        </button>
+    `;
+
+    serverInfo.innerHTML = serverDetailsHTML;
+
+    // Add click event for View Tools button
+    serverInfo.querySelector('.view-tools-btn').addEventListener('click', function(e) {
+        e.preventDefault();
+        const serverId = this.dataset.serverId;
+        const serverName = this.dataset.serverName;
+        showToolsModal(serverId, serverName);
+    });
+
+    // Assemble server element
+    serverContent.appendChild(serverInfo);
+    serverElement.appendChild(serverHeader);
+    serverElement.appendChild(serverContent);
+
+    return serverElement;
+}
+
+// Show thinking indicator as an animated SVG
+function showThinking() {
+    const loadingMessage = document.createElement('div');
+    loadingMessage.className = 'loading-message';
+    loadingMessage.id = 'loadingMessage';
+    loadingMessage.innerHTML = `
+        <svg viewBox="0 0 24 24" xmlns="http://www.w3.org/2000/svg">
+            <circle cx="4" cy="12" r="2" fill="#7e8cc0">
+                <animate attributeName="opacity" dur="1s" values="0;1;0" repeatCount="indefinite" begin="0" />
+            </circle>
+            <circle cx="12" cy="12" r="2" fill="#7e8cc0">
+                <animate attributeName="opacity" dur="1s" values="0;1;0" repeatCount="indefinite" begin="0.3" />
+            </circle>
+            <circle cx="20" cy="12" r="2" fill="#7e8cc0">
+                <animate attributeName="opacity" dur="1s" values="0;1;0" repeatCount="indefinite" begin="0.6" />
+            </circle>
+        </svg>
+        <span>Processing your request...</span>
+    `;
+    chatMessages.appendChild(loadingMessage);
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+}
+
+// Hide thinking indicator
+function hideThinking() {
+    const loadingMessage = document.getElementById('loadingMessage');
+    if (loadingMessage) {
+        loadingMessage.remove();
+    }
+}
+
+// Conversation session: follow-up questions can use earlier answers and tool results
+let sessionId = sessionStorage.getItem('sessionId');
+
+async function getSessionId() {
+    if (!sessionId) {
+        const response = await fetch('/api/sessions', { method: 'POST' });
+        sessionId = (await response.json()).session_id;
+        sessionStorage.setItem('sessionId', sessionId);
+    }
+    return sessionId;
+}
+
+// Start a new conversation, forgetting the current one
+newChatBtn.addEventListener('click', async () => {
+    if (sessionId) {
+        fetch(`/api/sessions/${sessionId}`, { method: 'DELETE' }).catch(() => {});
+    }
+    sessionId = null;
+    sessionStorage.removeItem('sessionId');
+    chatMessages.querySelectorAll('.message').forEach((message) => message.remove());
+});
+
+// Handle form submission
+messageForm.addEventListener('submit', async (e) => {
+    e.preventDefault();
+
+    const message = userInput.value.trim();
+    if (!message) return;
+
+    // Add user message to chat
+    addUserMessage(message);
+
+    // Clear input
+    userInput.value = '';
+
+    // Show thinking indicator
+    showThinking();
+
+    try {
+        // Stream the agent run; fall back to the blocking endpoint
+        // if the browser or the server cannot stream
+        const session = await getSessionId().catch(() => null);
+        const data = await streamQuery(message, session).catch(async (error) => {
+            if (!error.fallback) throw error;
+            console.warn('Streaming unavailable, falling back:', error);
+            return processQuery(message, session);
+        });
+
+        // Hide thinking indicator
+        hideThinking();
+        removeStreamingMessage();
+
+        if (data.error) {
+            addBotMessage(`Error: ${data.error}`, []);
+        } else if (data.final_answer) {
+            // Display final answer with tool badges
+            addBotMessage(data.final_answer, data.tool_usage);
+        } else {
+            addBotMessage('Sorry, I could not process this request.', []);
+        }
+    } catch (error) {
+        hideThinking();
+        removeStreamingMessage();
+        addBotMessage(`Error: ${error.message}`, []);
+    }
+});
+
+// Send the query to the blocking endpoint
+async function processQuery(message, session) {
+    const response = await fetch('/api/process_query', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+            query: message,
+            session_id: session || undefined
+        })
+    });
+
+    const data = await response.json();
+    if (!response.ok) {
+        return { error: data.error || 'Something went wrong' };
+    }
+    return data;
+}
+
+// Send the query to the streaming endpoint and render events as they arrive
+async function streamQuery(message, session) {
+    const response = await fetch('/api/process_query/stream', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream'
+        },
+        body: JSON.stringify({
+            query: message,
+            session_id: session || undefined
+        })
+    });
+
+    // The server is overloaded: retrying on the blocking endpoint would not help
+    if (response.status === 429 || response.status === 503) {
+        const data = await response.json().catch(() => ({}));
+        const retryAfter = response.headers.get('Retry-After');
+        return { error: `${data.error || 'Server busy'}. Please retry in ${retryAfter || 'a few'} seconds.` };
+    }
+
+    if (!response.ok || !response.body) {
+        const error = new Error(`Streaming not available (status ${response.status})`);
+        error.fallback = true;
+        throw error;
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let streamedText = '';
+    let result = null;
+
+    while (result === null) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Server-Sent Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            const payload = rawEvent.split('\n')
+                .filter(line => line.startsWith('data: '))
+                .map(line => line.slice(6))
+                .join('\n');
+            if (!payload) continue;
+
+            const event = JSON.parse(payload);
+            if (event.type === 'queued') {
+                setThinkingStatus(`Waiting in queue (${event.position} ahead)...`);
+            } else if (event.type === 'token') {
+                streamedText += event.content;
+                updateStreamingMessage(streamedText);
+            } else if (event.type === 'tool_call') {
+                // Text before a tool call is the model reasoning, not the answer
+                streamedText = '';
+                removeStreamingMessage();
+                setThinkingStatus(`Calling ${event.tool}...`);
+            } else if (event.type === 'tool_result') {
+                setThinkingStatus(`${event.tool} finished, thinking...`);
+            } else if (event.type === 'final') {
+                result = event;
+            } else if (event.type === 'error') {
+                result = { error: event.error };
+            }
+        }
+    }
+
+    if (result === null) {
+        throw new Error('Stream ended without a final answer');
+    }
+    return result;
+}
+
+// Update the text of the thinking indicator
+function setThinkingStatus(text) {
+    const status = document.querySelector('#loadingMessage span');
+    if (status) {
+        status.textContent = text;
+    }
+}
+
+// Render streamed tokens in a temporary bot message above the indicator
+function updateStreamingMessage(text) {
+    let streamingMessage = document.getElementById('streamingMessage');
+    if (!streamingMessage) {
+        streamingMessage = document.createElement('div');
+        streamingMessage.className = 'message bot-message';
+        streamingMessage.id = 'streamingMessage';
+        const loadingMessage = document.getElementById('loadingMessage');
+        chatMessages.insertBefore(streamingMessage, loadingMessage);
+    }
+    streamingMessage.innerHTML = marked.parse(text);
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+}
+
+function removeStreamingMessage() {
+    const streamingMessage = document.getElementById('streamingMessage');
+    if (streamingMessage) {
+        streamingMessage.remove();
+    }
+}
+
+// Load servers on page load
+window.addEventListener('load', () => {
+    // Update welcome message
+    const welcomeMessage = document.querySelector('.welcome-message');
+    welcomeMessage.innerHTML = `
+        <i class="fas fa-terminal"></i>
+        <h4>MCP Client Interface</h4>
+        <p class="example-queries">Try asking: <span class="example-query">"Query the users table in MySQL"</span> or <span class="example-query">"List files in the current directory"</span></p>
+    `;
+
+    // Add event listeners to example queries
+    document.querySelectorAll('.example-query').forEach(query => {
+        query.addEventListener('click', () => {
+            userInput.value = query.textContent;
+            userInput.focus();
+            // Trigger the form submission
+            const submitEvent = new Event('submit');
+            messageForm.dispatchEvent(submitEvent);
+        });
+    });
+
+    // Load servers
+    loadServers();
+});
+
+// Add a user message to the chat
+function addUserMessage(message) {
+    const messageDiv = document.createElement('div');
+    messageDiv.className = 'message user-message';
+    messageDiv.textContent = message;
+    chatMessages.appendChild(messageDiv);
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+}
+
+// Create a tool badge with popover
+function createToolBadge(tool) {
+    console.log("Creating tool badge for:", tool);
+
+    const badge = document.createElement('div');
+    badge.className = 'tool-badge';
+
+    // Determine tool name to display
+    const toolName = tool.tool || tool.name || "Tool";
+    badge.innerHTML = `<i class="fas fa-wrench"></i>${toolName}`;
+
+    const popover = document.createElement('div');
+    popover.className = 'tool-popover';
+
+    const popoverHeader = document.createElement('div');
+    popoverHeader.className = 'tool-popover-header';
+    popoverHeader.innerHTML = `
+        <h6><i class="fas fa-wrench"></i>${toolName}</h6>
+        <button class="tool-popover-close"><i class="fas fa-times"></i></button>
+    `;
+
+    const popoverBody = document.createElement('div');
+    popoverBody.className = 'tool-popover-body';
+
+    // Format the tool arguments or result
+    if (tool.args) {
+        popoverBody.textContent = JSON.stringify(tool.args, null, 2);
+    } else if (tool.result) {
+        popoverBody.textContent = typeof tool.result === 'object' ? 
+            JSON.stringify(tool.result, null, 2) : tool.result;
+    } else {
+        popoverBody.textContent = "No details available";
+    }
+
+    // Large results reach the model truncated; fetch the full payload on demand
+    if (tool.result_handle) {
+        const loadButton = document.createElement('button');
+        loadButton.className = 'btn btn-sm btn-outline-secondary mt-2 d-block';
+        loadButton.textContent = 'Load full result';
+        loadButton.addEventListener('click', async (e) => {
+            e.stopPropagation();
+            loadButton.disabled = true;
+            try {
+                const response = await fetch(`/api/tool_results/${tool.result_handle}`);
+                const data = await response.json();
+                const fullResult = document.createElement('pre');
+                fullResult.textContent = response.ok ? data.content : data.error;
+                popoverBody.appendChild(fullResult);
+                loadButton.remove();
+            } catch (error) {
+                console.error('Error loading full tool result:', error);
+                loadButton.disabled = false;
+            }
+        });
+        popoverBody.appendChild(loadButton);
+    }
+
+    popover.appendChild(popoverHeader);
+    popover.appendChild(popoverBody);
+
+    // Position the popover below the badge
+    badge.addEventListener('click', (e) => {
+        e.stopPropagation();
+
+        // Close any open popovers
+        if (activePopover && activePopover !== popover) {
+            activePopover.classList.remove('show');
+        }
+
+        // Toggle popover visibility
+        popover.classList.toggle('show');
+
+        if (popover.classList.contains('show')) {
+            const rect = badge.getBoundingClientRect();
+            popover.style.top = `${rect.bottom + 10}px`;
+            popover.style.left = `${rect.left}px`;
+            activePopover = popover;
+        } else {
+            activePopover = null;
+        }
+    });
+
+    // Add close button functionality
+    popover.querySelector('.tool-popover-close').addEventListener('click', (e) => {
+        e.stopPropagation();
+        popover.classList.remove('show');
+        activePopover = null;
+    });
+
+    return { badge, popover };
+}
+
+// Add a bot message to the chat with markdown support and tool badges
+function addBotMessage(message, tools) {
+    const messageDiv = document.createElement('div');
+    messageDiv.className = 'message bot-message';
+
+    // Parse markdown and set as HTML
+    messageDiv.innerHTML = marked.parse(message);
+
+    // Add tool badges if tools were used
+    if (tools && tools.length > 0) {
+        const badgesContainer = document.createElement('div');
+        badgesContainer.style.display = 'flex';
+        badgesContainer.style.flexWrap = 'wrap';
+        badgesContainer.style.gap = '5px';
+
+        tools.forEach(tool => {
+            const { badge, popover } = createToolBadge(tool);
+            badgesContainer.appendChild(badge);
+            messageDiv.appendChild(popover);
+        });
+
+        messageDiv.appendChild(badgesContainer);
+    }
+
+    chatMessages.appendChild(messageDiv);
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+}
+
+// Add Server Modal Functions
+function showAddServerModal() {
+    addServerModalOverlay.style.display = 'flex';
+}
+
+function hideAddServerModal() {
+    addServerModalOverlay.style.display = 'none';
+
+    // Clear form values
+    document.getElementById('serverName').value = '';
+    document.getElementById('serverArgs').value = '';
+    document.getElementById('serverUrl').value = '';
+    document.getElementById('jsonServerName').value = '';
+    document.getElementById('jsonConfig').value = '';
+    document.getElementById('addServerError').style.display = 'none';
+}
+
+// Tab switching functions
+const formTabBtn = document.getElementById('formTabBtn');
+const jsonTabBtn = document.getElementById('jsonTabBtn');
+const formConfigTab = document.getElementById('formConfigTab');
+const jsonConfigTab = document.getElementById('jsonConfigTab');
+
+formTabBtn.addEventListener('click', function() {
+    formTabBtn.classList.add('active');
+    jsonTabBtn.classList.remove('active');
+    formConfigTab.style.display = 'block';
+    jsonConfigTab.style.display = 'none';
+});
+
+jsonTabBtn.addEventListener('click', function() {
+    jsonTabBtn.classList.add('active');
+    formTabBtn.classList.remove('active');
+    jsonConfigTab.style.display = 'block';
+    formConfigTab.style.display = 'none';
+});
+
+// stdio servers are started from a command, the others are reached at a URL
+const serverTransportSelect = document.getElementById('serverTransport');
+serverTransportSelect.addEventListener('change', function() {
+    const stdio = this.value === 'stdio';
+    document.querySelectorAll('#manualServerForm .stdio-field').forEach(field => {
+        field.style.display = stdio ? 'block' : 'none';
+    });
+    document.querySelector('#manualServerForm .url-field').style.display = stdio ? 'none' : 'block';
+});
+
+// Add manual server
+const addManualServerBtn = document.getElementById('addManualServerBtn');
+addManualServerBtn.addEventListener('click', function() {
+    const serverName = document.getElementById('serverName').value.trim();
+    const serverCommand = document.getElementById('serverCommand').value.trim();
+    const serverArgs = document.getElementById('serverArgs').value.trim();
+    const serverUrl = document.getElementById('serverUrl').value.trim();
+    const serverTransport = document.getElementById('serverTransport').value;
+    const errorElement = document.getElementById('addServerError');
+
+    // Validation
+    if (!serverName) {
+        errorElement.textContent = 'Please enter a server name';
+        errorElement.style.display = 'block';
+        return;
+    }
+
+    if (serverTransport === 'stdio' && !serverArgs) {
+        errorElement.textContent = 'Please enter script path';
+        errorElement.style.display = 'block';
+        return;
+    }
+
+    if (serverTransport !== 'stdio' && !serverUrl) {
+        errorElement.textContent = 'Please enter the server URL';
+        errorElement.style.display = 'block';
+        return;
+    }
+
+    // Create server config
+    const serverConfig = serverTransport === 'stdio' ? {
+        command: serverCommand,
+        args: [serverArgs],
+        transport: serverTransport
+    } : {
+        url: serverUrl,
+        transport: serverTransport
+    };
+
+    // Add server
+    addServerToSystem(serverName, serverConfig);
+});
+
+// Add server with JSON config
+const addJsonServerBtn = document.getElementById('addJsonServerBtn');
+addJsonServerBtn.addEventListener('click', function() {
+    const serverName = document.getElementById('jsonServerName').value.trim();
+    const jsonConfigStr = document.getElementById('jsonConfig').value.trim();
+    const errorElement = document.getElementById('addServerError');
+
+    // Validation
+    if (!serverName) {
+        errorElement.textContent = 'Please enter a server name';
+        errorElement.style.display = 'block';
+        return;
+    }
+
+    if (!jsonConfigStr) {
+        errorElement.textContent = 'Please enter JSON configuration';
+        errorElement.style.display = 'block';
+        return;
+    }
+
+    // Parse JSON
+    try {
+        const serverConfig = JSON.parse(jsonConfigStr);
+
+        // Validate JSON structure
+        if (!serverConfig.transport) {
+            errorElement.textContent = 'JSON must include "transport" field';
+            errorElement.style.display = 'block';
+            return;
+        }
+
+        if (serverConfig.transport !== 'stdio') {
+            if (!serverConfig.url) {
+                errorElement.textContent = 'JSON must include "url" field';
+                errorElement.style.display = 'block';
+                return;
+            }
+        } else if (!serverConfig.command) {
+            errorElement.textContent = 'JSON must include "command" field';
+            errorElement.style.display = 'block';
+            return;
+        } else if (!serverConfig.args || !Array.isArray(serverConfig.args) || serverConfig.args.length === 0) {
+            errorElement.textContent = 'JSON must include "args" as a non-empty array';
+            errorElement.style.display = 'block';
+            return;
+        }
+
+        // Add server
+        addServerToSystem(serverName, serverConfig);
+    } catch (e) {
+        errorElement.textContent = 'Invalid JSON format: ' + e.message;
+        errorElement.style.display = 'block';
+        return;
+    }
+});
+
+// Common function to add server
+function addServerToSystem(serverName, serverConfig) {
+    const errorElement = document.getElementById('addServerError');
+
+    // Send request to add server
+    fetch('/api/add_server', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+            name: serverName,
+            config: serverConfig
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            // Add new server to UI
+            const server = {
+                id: serverName.toLowerCase(),
+                name: serverName,
+                type: "Python",
+                command: serverConfig.command,
+                url: serverConfig.url,
+                transport: serverConfig.transport,
+                args: serverConfig.args
+            };
+
+            const serverElement = createServerElement(server);
+            serversContainer.appendChild(serverElement);
+
+            // Update server count
+            const serverCount = document.querySelectorAll('.server-details').length;
+            document.querySelector('.server-info').textContent = `${serverCount} servers available`;
+
+            // Close modal
+            hideAddServerModal();
+
+            // Show success message
+            addBotMessage(`Successfully added new MCP server: ${serverName}`, []);
+        } else {
+            errorElement.textContent = data.error || 'Failed to add server';
+            errorElement.style.display = 'block';
+        }
+    })
+    .catch(error => {
+        console.error('Error adding server:', error);
+        errorElement.textContent = 'Error connecting to server';
+        errorElement.style.display = 'block';
+    });
+}
+
+// Add Server Modal event listeners
+addServerBtn.addEventListener('click', showAddServerModal);
+closeAddServerModal.addEventListener('click', hideAddServerModal);
+closeAddServerBtn.addEventListener('click', hideAddServerModal);
+addServerModalOverlay.addEventListener('click', function(e) {
+    if (e.target === addServerModalOverlay) {
+        hideAddServerModal();
+    }
+});
+
+// Theme switcher functionality
+const themeToggle = document.getElementById('themeToggle');
+const themePanel = document.getElementById('themePanel');
+const themePanelOverlay = document.getElementById('themePanelOverlay');
+const themePanelClose = document.getElementById('themePanelClose');
+const themeOptions = document.querySelectorAll('.theme-option');
+
+// Theme definitions
+const themes = {
+    default: {
+        '--bg-dark': '#02343F',
+        '--bg-sidebar': '#02343F',
+        '--bg-card': '#50586C',
+        '--text-primary': '#FFFFFF',
+        '--text-secondary': '#F0EDCC',
+        '--primary-color': '#2BAE66',
+        '--primary-dark': '#249555',
+        '--primary-light': '#3FCA7D',
+        '--secondary-color': '#F0EDCC',
+        '--accent-color': '#2BAE66',
+        '--color-accent': '#2BAE66',
+        '--color-accent-muted': 'rgba(43, 174, 102, 0.15)',
+        '--border-color': 'rgba(240, 237, 204, 0.2)',
+        '--input-bg': '#50586C',
+        '--gradient-bg': 'linear-gradient(135deg, #02343F 0%, #033F4C 100%)',
+        '--card-gradient': 'linear-gradient(to right, #50586C, #434A5C)',
+        '--header-gradient': 'linear-gradient(to right, #02343F, #033F4C)'
+    },
+    dark: {
+        '--bg-dark': '#1a1d25',
+        '--bg-sidebar': '#22252f',
+        '--bg-card': '#2c2f3a',
+        '--text-primary': '#e1e2e6',
+        '--text-secondary': '#a7aab6',
+        '--primary-color': '#486eb8',
+        '--primary-dark': '#3a5798',
+        '--primary-light': '#5a81cb',
+        '--secondary-color': '#41806a',
+        '--accent-color': '#6666b0',
+        '--color-accent': '#6666b0',
+        '--color-accent-muted': 'rgba(102, 102, 176, 0.1)',
+        '--border-color': '#3d404d',
+        '--input-bg': '#2c2f3a',
+        '--gradient-bg': 'linear-gradient(135deg, #1a1d25 0%, #22252f 100%)',
+        '--card-gradient': 'linear-gradient(to right, rgba(44, 47, 58, 0.8), rgba(44, 47, 58, 0.6))',
+        '--header-gradient': 'linear-gradient(to right, #3a5798, #486eb8)'
+    },
+    night: {
+        '--bg-dark': '#000000',
+        '--bg-sidebar': '#000000',
+        '--bg-card': '#121212',
+        '--text-primary': '#FFFFFF',
+        '--text-secondary': 'rgba(255, 255, 255, 0.7)',
+        '--primary-color': '#FFFFFF',
+        '--primary-dark': 'rgba(255, 255, 255, 0.8)',
+        '--primary-light': '#FFFFFF',
+        '--secondary-color': '#FFFFFF',
+        '--accent-color': '#FFFFFF',
+        '--color-accent': '#FFFFFF',
+        '--color-accent-muted': 'rgba(255, 255, 255, 0.1)',
+        '--border-color': 'rgba(255, 255, 255, 0.2)',
+        '--input-bg': '#121212',
+        '--gradient-bg': 'linear-gradient(135deg, #000000 0%, #000000 100%)',
+        '--card-gradient': 'linear-gradient(to right, #121212, #121212)',
+        '--header-gradient': 'linear-gradient(to right, #000000, #000000)'
+    },
+    forest: {
+        '--bg-dark': '#2C3639',
+        '--bg-sidebar': '#3F4E4F',
+        '--bg-card': '#3F4E4F',
+        '--text-primary': '#DCD7C9',
+        '--text-secondary': '#A27B5C',
+        '--primary-color': '#7D9D9C',
+        '--primary-dark': '#576F72',
+        '--primary-light': '#8FBDD3',
+        '--secondary-color': '#A27B5C',
+        '--accent-color': '#7D9D9C',
+        '--color-accent': '#7D9D9C',
+        '--color-accent-muted': 'rgba(125, 157, 156, 0.15)',
+        '--border-color': 'rgba(220, 215, 201, 0.2)',
+        '--input-bg': '#3F4E4F',
+        '--gradient-bg': 'linear-gradient(135deg, #2C3639 0%, #3F4E4F 100%)',
+        '--card-gradient': 'linear-gradient(to right, #3F4E4F, #364445)',
+        '--header-gradient': 'linear-gradient(to right, #2C3639, #3F4E4F)'
+    },
+    ocean: {
+        '--bg-dark': '#1A374D',
+        '--bg-sidebar': '#406882',
+        '--bg-card': '#406882',
+        '--text-primary': '#F9F9F9',
+        '--text-secondary': '#B1D0E0',
+        '--primary-color': '#6998AB',
+        '--primary-dark': '#1A374D',
+        '--primary-light': '#B1D0E0',
+        '--secondary-color': '#B1D0E0',
+        '--accent-color': '#6998AB',
+        '--color-accent': '#6998AB',
+        '--color-accent-muted': 'rgba(105, 152, 171, 0.15)',
+        '--border-color': 'rgba(177, 208, 224, 0.2)',
+        '--input-bg': '#406882',
+        '--gradient-bg': 'linear-gradient(135deg, #1A374D 0%, #406882 100%)',
+        '--card-gradient': 'linear-gradient(to right, #406882, #365b74)',
+        '--header-gradient': 'linear-gradient(to right, #1A374D, #406882)'
+    },
+    purple: {
+        '--bg-dark': '#392467',
+        '--bg-sidebar': '#5D3587',
+        '--bg-card': '#5D3587',
+        '--text-primary': '#F1EAFF',
+        '--text-secondary': '#A367B1',
+        '--primary-color': '#A367B1',
+        '--primary-dark': '#392467',
+        '--primary-light': '#D09CFA',
+        '--secondary-color': '#A367B1',
+        '--accent-color': '#A367B1',
+        '--color-accent': '#A367B1',
+        '--color-accent-muted': 'rgba(163, 103, 177, 0.15)',
+        '--border-color': 'rgba(241, 234, 255, 0.2)',
+        '--input-bg': '#5D3587',
+        '--gradient-bg': 'linear-gradient(135deg, #392467 0%, #5D3587 100%)',
+        '--card-gradient': 'linear-gradient(to right, #5D3587, #4f2e72)',
+        '--header-gradient': 'linear-gradient(to right, #392467, #5D3587)'
+    }
+};
+
+// Function to open theme panel
+function openThemePanel() {
+    themePanel.classList.add('open');
+    themePanelOverlay.classList.add('open');
+}
+
+// Function to close theme panel
+function closeThemePanel() {
+    themePanel.classList.remove('open');
+    themePanelOverlay.classList.remove('open');
+}
+
+// Function to apply theme
+function applyTheme(themeName) {
+    const theme = themes[themeName];
+    if (!theme) return;
+
+    // Mark the selected theme as active
+    document.querySelectorAll('.theme-option').forEach(option => {
+        if (option.dataset.theme === themeName) {
+            option.classList.add('active');
+        } else {
+            option.classList.remove('active');
+        }
+    });
+
+    // Apply theme CSS variables
+    const root = document.documentElement;
+    for (const [property, value] of Object.entries(theme)) {
+        root.style.setProperty(property, value);
+    }
+
+    // Save theme preference
+    localStorage.setItem('preferredTheme', themeName);
+}
+
+// Load saved theme or default
+function loadSavedTheme() {
+    const savedTheme = localStorage.getItem('preferredTheme') || 'night';
+    applyTheme(savedTheme);
+}
+
+// Theme panel event listeners
+themeToggle.addEventListener('click', openThemePanel);
+themePanelClose.addEventListener('click', closeThemePanel);
+themePanelOverlay.addEventListener('click', closeThemePanel);
+
+// Theme option event listeners
+themeOptions.forEach(option => {
+    option.addEventListener('click', function() {
+        const themeName = this.dataset.theme;
+        applyTheme(themeName);
+        closeThemePanel();
+    });
+});
+
+// Load saved theme on page load
+document.addEventListener('DOMContentLoaded', loadSavedTheme);
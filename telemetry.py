@@ -0,0 +1,258 @@
+# telemetry.py
+import asyncio
+import contextvars
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+try:
+    # Spans are only recorded when an OpenTelemetry SDK is configured
+    # (e.g. with opentelemetry-instrument); the API alone is a no-op
+    from opentelemetry import trace
+    tracer = trace.get_tracer("schleppa-mcp-client")
+except ImportError:
+    trace = None
+    tracer = None
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s"
+# Set by gunicorn.conf.py when several workers have to share their metrics
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+logger = logging.getLogger(__name__)
+
+
+def configure_logging(level=None):
+    """Send log records to stderr at LOG_LEVEL; stdout is the MCP transport of the stdio servers"""
+    logging.basicConfig(level=level or os.getenv("LOG_LEVEL", "INFO").upper(), format=LOG_FORMAT, stream=sys.stderr)
+
+
+# Buckets from a few milliseconds (cached tool calls) to minutes (slow models)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+QUERY_SECONDS = Histogram(
+    "mcp_client_query_seconds", "Duration of an agent run, from start to final answer",
+    ["mode", "status"], buckets=LATENCY_BUCKETS,
+)
+JOB_WAIT_SECONDS = Histogram(
+    "mcp_client_job_wait_seconds", "Time a query waited in the job queue",
+    buckets=LATENCY_BUCKETS,
+)
+MCP_CONNECT_SECONDS = Histogram(
+    "mcp_client_mcp_connect_seconds", "Time to spawn an MCP server and complete the handshake",
+    ["server", "status"], buckets=LATENCY_BUCKETS,
+)
+LIST_TOOLS_SECONDS = Histogram(
+    "mcp_client_list_tools_seconds", "Time to list the tools of an MCP server",
+    ["server", "status"], buckets=LATENCY_BUCKETS,
+)
+AGENT_BUILD_SECONDS = Histogram(
+    "mcp_client_agent_build_seconds", "Time to compile an agent graph",
+    ["status"], buckets=LATENCY_BUCKETS,
+)
+LLM_CALL_SECONDS = Histogram(
+    "mcp_client_llm_call_seconds", "Duration of a chat model call",
+    ["provider", "model", "status"], buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "mcp_client_llm_tokens", "Tokens sent to and generated by the chat model; cached input tokens also count as input",
+    ["provider", "model", "kind"],
+)
+TOOL_CALL_SECONDS = Histogram(
+    "mcp_client_tool_call_seconds", "Duration of an MCP tool call",
+    ["server", "tool", "status"], buckets=LATENCY_BUCKETS,
+)
+CIRCUIT_OPENED = Counter(
+    "mcp_client_circuit_opened", "Times an MCP server's circuit opened after repeated failures",
+    ["server"],
+)
+TOOL_SELECTIONS = Counter(
+    "mcp_client_tool_selections", "Tool sets picked for a query: a relevant subset, or all tools",
+    ["mode", "outcome"],
+)
+TOOL_SCHEMA_TOKENS_SAVED = Counter(
+    "mcp_client_tool_schema_tokens_saved",
+    "Estimated tool-schema tokens left out of each model call prompt by tool selection",
+)
+
+# Per-query totals of each stage, logged when the query finishes
+_timings = contextvars.ContextVar("timings", default=None)
+
+
+class QueryTimings:
+    """Time spent in each stage by one query, and how many times it was entered"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        # Token counts of the model calls, as reported by the provider
+        self.usage = {"input_tokens": 0, "output_tokens": 0, "cached_tokens": 0}
+        # Set to "error" by callers that turn failures into an answer
+        self.status = "ok"
+
+    def add(self, stage, seconds):
+        total, count = self.stages.get(stage, (0.0, 0))
+        self.stages[stage] = (total + seconds, count + 1)
+
+    def add_usage(self, input_tokens, output_tokens, cached_tokens):
+        self.usage["input_tokens"] += input_tokens
+        self.usage["output_tokens"] += output_tokens
+        self.usage["cached_tokens"] += cached_tokens
+
+    def summary(self):
+        parts = [f"total {time.perf_counter() - self.started:.3f}s"]
+        parts.extend(
+            f"{stage} {total:.3f}s/{count}" for stage, (total, count) in sorted(self.stages.items())
+        )
+        if self.usage["input_tokens"] or self.usage["output_tokens"]:
+            parts.append("tokens in/cached/out {input_tokens}/{cached_tokens}/{output_tokens}".format(**self.usage))
+        return ", ".join(parts)
+
+
+@contextmanager
+def track_query(mode):
+    """Time an agent run; stages entered inside it (also from child tasks) add to its totals"""
+    timings = QueryTimings()
+    token = _timings.set(timings)
+    status = "error"
+    try:
+        yield timings
+        status = timings.status
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    finally:
+        _timings.reset(token)
+        QUERY_SECONDS.labels(mode=mode, status=status).observe(time.perf_counter() - timings.started)
+        logger.info("Query %s (%s): %s", status, mode, timings.summary())
+
+
+def record_stage(stage, seconds):
+    timings = _timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+def current_timings():
+    """Timings of the query being tracked in this context, if any"""
+    return _timings.get()
+
+
+@contextmanager
+def timed(stage, histogram=None, **labels):
+    """Time a block into histogram (labelled with labels and status) and an OpenTelemetry span"""
+    span = tracer.start_as_current_span(stage, attributes=labels) if tracer is not None else nullcontext()
+    with span:
+        started = time.perf_counter()
+        status = "error"
+        try:
+            yield
+            status = "ok"
+        finally:
+            elapsed = time.perf_counter() - started
+            if histogram is not None:
+                histogram.labels(status=status, **labels).observe(elapsed)
+            record_stage(stage, elapsed)
+            logger.debug("%s %s took %.3fs (%s)", stage, labels, elapsed, status)
+
+
+class ToolCallMetrics:
+    """Tool call interceptor timing each call per server and tool"""
+
+    async def __call__(self, request, handler):
+        with timed("tool_call", TOOL_CALL_SECONDS, server=request.server_name, tool=request.name):
+            return await handler(request)
+
+
+def _token_usage(response):
+    """(input, output, cached input) token counts of a chat model response, if the provider reported them"""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                # "cache_read", or "<service tier>_cache_read" for OpenAI's priority/flex tiers
+                details = usage.get("input_token_details") or {}
+                cached = sum(value or 0 for key, value in details.items() if key.endswith("cache_read"))
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0), cached
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0), cached
+    return None
+
+
+class LLMCallMetrics(AsyncCallbackHandler):
+    """Callback handler timing chat model calls and counting their tokens.
+
+    Listed after the concurrency limiter, so time spent waiting for a slot
+    is not counted as model time.
+    """
+
+    run_inline = True
+
+    def __init__(self, provider, model):
+        self.provider = provider
+        self.model = model
+        self._calls = {}
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        span = None
+        if tracer is not None:
+            span = tracer.start_span("llm_call", attributes={"provider": self.provider, "model": self.model})
+        self._calls[run_id] = (time.perf_counter(), span)
+        task = asyncio.current_task()
+        if task is not None:
+            # Cancelled calls get neither on_llm_end nor on_llm_error
+            task.add_done_callback(lambda _task: self._finish(run_id, "cancelled"))
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = _token_usage(response)
+        if usage is not None:
+            LLM_TOKENS.labels(provider=self.provider, model=self.model, kind="input").inc(usage[0])
+            LLM_TOKENS.labels(provider=self.provider, model=self.model, kind="output").inc(usage[1])
+            LLM_TOKENS.labels(provider=self.provider, model=self.model, kind="cached").inc(usage[2])
+            timings = _timings.get()
+            if timings is not None:
+                timings.add_usage(*usage)
+        self._finish(run_id, "ok", usage)
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, "error")
+
+    def _finish(self, run_id, status, usage=None):
+        call = self._calls.pop(run_id, None)
+        if call is None:
+            return
+        started, span = call
+        elapsed = time.perf_counter() - started
+        LLM_CALL_SECONDS.labels(provider=self.provider, model=self.model, status=status).observe(elapsed)
+        record_stage("llm_call", elapsed)
+        logger.debug("LLM call to %s took %.3fs, tokens in/out/cached: %s", self.model, elapsed, usage)
+        if span is not None:
+            if usage is not None:
+                span.set_attribute("input_tokens", usage[0])
+                span.set_attribute("output_tokens", usage[1])
+                span.set_attribute("cached_tokens", usage[2])
+            span.end()
+
+
+def metrics_payload():
+    """Prometheus exposition of the metrics, merged across workers in multiprocess mode"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
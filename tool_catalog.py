@@ -0,0 +1,143 @@
+# tool_catalog.py
+import asyncio
+import hashlib
+import json
+import logging
+import time
+
+from telemetry import LIST_TOOLS_SECONDS, timed
+
+logger = logging.getLogger(__name__)
+
+
+def config_hash(config):
+    """Stable hash of a server configuration"""
+    encoded = json.dumps(config, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class CatalogEntry:
+    """LangChain tools listed from one server, with the config they were built from"""
+
+    def __init__(self, server_name, config_hash, tools):
+        self.server_name = server_name
+        self.config_hash = config_hash
+        self.tools = tools
+        self.built_at = time.time()
+
+
+class ToolCatalog:
+    """Cache of the tools exposed by every MCP server in the pool.
+
+    Entries are keyed by server name and config hash: they are built once,
+    rebuilt when the server's config changes, when they are invalidated
+    explicitly or when the server sends a tools/list_changed notification.
+    A server that fails to list its tools, or whose circuit is open, is left
+    out of the catalog until it recovers instead of failing the whole of it.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.version = 0
+        self._entries = {}
+        self._locks = {}
+        # Servers left out of the last lookup
+        self.unavailable = set()
+        pool.add_tools_changed_listener(self.invalidate)
+
+    def invalidate(self, server_name=None):
+        """Drop the cached tools of one server, or of all servers"""
+        names = [server_name] if server_name is not None else list(self._entries)
+        for name in names:
+            if self._entries.pop(name, None) is not None:
+                logger.info("Tool catalog invalidated for server '%s'", name)
+                self.version += 1
+
+    async def _build(self, server_name, expected_hash):
+        lock = self._locks.setdefault(server_name, asyncio.Lock())
+        async with lock:
+            # Another request may have built it while we waited for the lock
+            entry = self._entries.get(server_name)
+            if entry is not None and entry.config_hash == expected_hash:
+                return entry
+            logger.info("Building tool catalog for server '%s'", server_name)
+            with timed("list_tools", LIST_TOOLS_SECONDS, server=server_name):
+                tools = await self.pool.get_server_tools(server_name)
+            entry = CatalogEntry(server_name, expected_hash, tools)
+            self._entries[server_name] = entry
+            self.version += 1
+            return entry
+
+    async def get_tools_by_server(self):
+        """Get LangChain tools keyed by server name, building stale entries"""
+        servers = dict(self.pool.servers)
+        for name in list(self._entries):
+            if name not in servers:
+                self.invalidate(name)
+
+        unavailable = {name for name in servers if not self.pool.available(name)}
+        stale = {}
+        for name, config in servers.items():
+            expected_hash = config_hash(config)
+            entry = self._entries.get(name)
+            if name not in unavailable and (entry is None or entry.config_hash != expected_hash):
+                stale[name] = expected_hash
+        if stale:
+            results = await asyncio.gather(
+                *(self._build(name, h) for name, h in stale.items()), return_exceptions=True
+            )
+            for name, result in zip(stale, results):
+                if isinstance(result, BaseException):
+                    logger.warning("Leaving MCP server '%s' out of the tool catalog: %s", name, result)
+                    unavailable.add(name)
+        if unavailable != self.unavailable:
+            self.unavailable = unavailable
+            self.version += 1
+        return {name: entry.tools for name, entry in self._available_entries().items() if name in servers}
+
+    def _available_entries(self):
+        return {name: entry for name, entry in self._entries.items() if name not in self.unavailable}
+
+    async def get_tools(self):
+        """Get LangChain tools of all servers as a flat list, sorted by name.
+
+        The tool schemas open every prompt; a fixed order, whatever the order
+        servers were added or answered in, lets the model server reuse its
+        cached prefix.
+        """
+        tools_by_server = await self.get_tools_by_server()
+        return sorted((tool for tools in tools_by_server.values() for tool in tools), key=lambda tool: tool.name)
+
+    async def refresh(self, server_name=None):
+        """Rebuild the catalog now instead of on the next lookup"""
+        self.invalidate(server_name)
+        return await self.get_tools_by_server()
+
+    @property
+    def fingerprint(self):
+        """Hash of the servers and tool names in the catalog, stable across restarts"""
+        return config_hash({
+            name: [entry.config_hash, sorted(tool.name for tool in entry.tools)]
+            for name, entry in self._available_entries().items()
+        })
+
+    @property
+    def built_at(self):
+        return max((entry.built_at for entry in self._entries.values()), default=None)
+
+    def info(self):
+        """Catalog metadata, without the tools themselves"""
+        return {
+            "version": self.version,
+            "fingerprint": self.fingerprint,
+            "built_at": self.built_at,
+            "servers": {
+                name: {
+                    "config_hash": entry.config_hash,
+                    "built_at": entry.built_at,
+                    "tools": [tool.name for tool in entry.tools],
+                }
+                for name, entry in self._available_entries().items()
+            },
+            "unavailable": sorted(self.unavailable),
+        }
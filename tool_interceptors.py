@@ -0,0 +1,29 @@
+# tool_interceptors.py
+import asyncio
+import os
+
+# Upper bound on MCP tool calls running at the same time, across all servers.
+# Per-server concurrency is bounded by the session pool size of each server.
+MAX_CONCURRENT_TOOL_CALLS = int(os.getenv("MAX_CONCURRENT_TOOL_CALLS", "8"))
+
+
+class ConcurrencyLimiter:
+    """Tool call interceptor capping the number of calls in flight"""
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_TOOL_CALLS):
+        self.max_concurrent = max_concurrent
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, request, handler):
+        async with self._semaphore:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            try:
+                return await handler(request)
+            finally:
+                self.in_flight -= 1
+
+    def status(self):
+        return {"max_concurrent": self.max_concurrent, "in_flight": self.in_flight, "peak": self.peak}
@@ -0,0 +1,144 @@
+# tool_result_cache.py
+import json
+import os
+import time
+from collections import OrderedDict
+
+from mcp.types import CallToolResult
+
+# The cache is opt-in: tool results can go stale if something other than
+# the agent changes the underlying files or tables
+TOOL_CACHE_ENABLED = os.getenv("TOOL_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "256"))
+
+# Seconds a result stays valid, per tool; tools not listed are never cached
+DEFAULT_TOOL_TTLS = {
+    "read_file": 30,
+    "read_file_chunk": 30,
+    "read_files": 30,
+    "list_files": 10,
+    "search_files": 10,
+    "mysql_select": 30,
+    "mysql_show_databases": 60,
+}
+
+# Tools that change server state; running one drops the cached results of its server
+MUTATING_TOOLS = {
+    "write_file",
+    "write_files",
+    "edit_file",
+    "make_file",
+    "mysql_query",
+    "mysql_create_table",
+    "mysql_insert",
+    "mysql_bulk_insert",
+    "mysql_transaction",
+    "mysql_update",
+    "mysql_delete",
+    "mysql_create_database",
+    "mysql_delete_database",
+}
+
+
+def parse_ttls(value):
+    """Parse "tool=seconds,tool=seconds" overrides"""
+    ttls = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            name, seconds = item.split("=", 1)
+            ttls[name.strip()] = float(seconds)
+    return ttls
+
+
+def canonical_args(args):
+    """Serialize tool arguments independently of key order"""
+    return json.dumps(args or {}, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ToolResultCache:
+    """Tool call interceptor caching results of idempotent tools.
+
+    Entries are keyed by server, tool name and canonicalized arguments,
+    expire after the tool's TTL and are evicted least-recently-used once
+    max_entries is reached.
+    """
+
+    def __init__(self, ttls=None, mutating_tools=None, max_entries=TOOL_CACHE_MAX_ENTRIES):
+        self.ttls = dict(DEFAULT_TOOL_TTLS if ttls is None else ttls)
+        self.mutating_tools = set(MUTATING_TOOLS if mutating_tools is None else mutating_tools)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # Bumped on every invalidation, so reads that raced a write are not stored
+        self._generations = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def __call__(self, request, handler):
+        server_name = request.server_name
+        if request.name in self.mutating_tools:
+            try:
+                return await handler(request)
+            finally:
+                self.invalidate(server_name)
+
+        ttl = self.ttls.get(request.name)
+        if not ttl:
+            return await handler(request)
+
+        key = (server_name, request.name, canonical_args(request.args))
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            del self._entries[key]
+
+        self.misses += 1
+        generation = self._generation(server_name)
+        result = await handler(request)
+        if (
+            isinstance(result, CallToolResult)
+            and not result.isError
+            and self._generation(server_name) == generation
+        ):
+            self._store(key, ttl, result)
+        return result
+
+    def _generation(self, server_name):
+        return (self._epoch, self._generations.get(server_name, 0))
+
+    def _store(self, key, ttl, result):
+        self._entries[key] = (time.monotonic() + ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, server_name=None):
+        """Drop cached results of one server, or of all servers"""
+        self.invalidations += 1
+        if server_name is None:
+            self._entries.clear()
+            self._epoch += 1
+            return
+        self._generations[server_name] = self._generations.get(server_name, 0) + 1
+        for key in [key for key in self._entries if key[0] == server_name]:
+            del self._entries[key]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "ttls": self.ttls,
+        }
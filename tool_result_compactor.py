@@ -0,0 +1,231 @@
+# tool_result_compactor.py
+import csv
+import io
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from mcp.types import CallToolResult, TextContent
+
+from mysql_backend import rewind_page_token
+
+TOOL_RESULT_COMPACT = os.getenv("TOOL_RESULT_COMPACT", "true").lower() in ("1", "true", "yes")
+# Approximate tokens a single tool result may take in the prompt (0 disables truncation)
+TOOL_RESULT_TOKEN_BUDGET = int(os.getenv("TOOL_RESULT_TOKEN_BUDGET", "2000"))
+TOOL_RESULT_STORE_MAX_ENTRIES = int(os.getenv("TOOL_RESULT_STORE_MAX_ENTRIES", "200"))
+TOOL_RESULT_STORE_TTL = float(os.getenv("TOOL_RESULT_STORE_TTL", "3600"))
+
+# Rough characters-per-token ratio used to turn the budget into a length
+CHARS_PER_TOKEN = 4
+# Tools that page their own output with a cursor, an offset or a continuation
+# line: cutting them would hide the way to the next page, so they are left as
+# they are (their page size settings bound them instead)
+SELF_PAGING_TOOLS = {"read_file", "read_file_chunk", "read_files", "list_files", "search_files"}
+HANDLE_PATTERN = re.compile(r"full_result_handle=([0-9a-f]{16})")
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN
+
+
+def find_handle(text):
+    """Return the stored-result handle mentioned in a compacted result, if any"""
+    match = HANDLE_PATTERN.search(text or "")
+    return match.group(1) if match else None
+
+
+def _csv_line(values):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="").writerow(
+        ["NULL" if value is None else value for value in values]
+    )
+    return buffer.getvalue()
+
+
+def parse_table(data):
+    """Return (columns, rows, extra fields) if data is tabular, else None.
+
+    Recognizes {"columns": [...], "rows": [[...]]} result sets and lists of
+    objects sharing their keys.
+    """
+    if isinstance(data, dict) and isinstance(data.get("columns"), list) and isinstance(data.get("rows"), list):
+        extras = {key: value for key, value in data.items() if key not in ("columns", "rows", "row_count")}
+        return data["columns"], data["rows"], extras
+    if isinstance(data, list) and data and all(isinstance(item, dict) for item in data):
+        columns = []
+        for item in data:
+            columns.extend(key for key in item if key not in columns)
+        return columns, [[item.get(column) for column in columns] for item in data], {}
+    return None
+
+
+class ResultStore:
+    """Full tool results kept server-side, behind a handle, for lazy fetching"""
+
+    def __init__(self, max_entries=TOOL_RESULT_STORE_MAX_ENTRIES, ttl=TOOL_RESULT_STORE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, server_name, tool_name, content):
+        handle = uuid.uuid4().hex[:16]
+        with self._lock:
+            self._entries[handle] = {
+                "handle": handle,
+                "server": server_name,
+                "tool": tool_name,
+                "content": content,
+                "created_at": time.time(),
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return handle
+
+    def get(self, handle):
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is None:
+                return None
+            if self.ttl and time.time() - entry["created_at"] > self.ttl:
+                del self._entries[handle]
+                return None
+            return entry
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": sum(len(entry["content"]) for entry in self._entries.values()),
+            }
+
+
+class ToolResultCompactor:
+    """Tool call interceptor shrinking results before they reach the prompt.
+
+    Tabular JSON (SQL result sets, lists of records) is re-encoded as CSV,
+    other JSON is minified, and anything still above the token budget is
+    truncated with a summary. The full result of a truncated call is kept in
+    the store and referenced by a handle in the summary.
+    """
+
+    def __init__(self, store, token_budget=TOOL_RESULT_TOKEN_BUDGET):
+        self.store = store
+        self.token_budget = token_budget
+        self.compacted = 0
+        self.truncated = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+
+    async def __call__(self, request, handler):
+        result = await handler(request)
+        if (
+            not isinstance(result, CallToolResult)
+            or result.isError
+            or not result.content
+            or not all(isinstance(block, TextContent) for block in result.content)
+        ):
+            return result
+
+        text = "".join(block.text for block in result.content)
+        compact = self.compact(text, request.server_name, request.name)
+        self.tokens_in += estimate_tokens(text)
+        self.tokens_out += estimate_tokens(compact)
+        if compact == text:
+            return result
+        self.compacted += 1
+        # The structured copy would keep the full payload in the message history
+        return CallToolResult(content=[TextContent(type="text", text=compact)], isError=False)
+
+    def compact(self, text, server_name, tool_name):
+        if tool_name in SELF_PAGING_TOOLS:
+            return text
+        max_chars = self.token_budget * CHARS_PER_TOKEN
+        data = None
+        try:
+            data = json.loads(text)
+        except ValueError:
+            pass
+
+        table = parse_table(data) if data is not None else None
+        if table is not None:
+            return self._encode_table(text, table, max_chars, server_name, tool_name)
+        text_out = text
+        if isinstance(data, (dict, list)):
+            encoded = json.dumps(data, separators=(",", ":"), default=str)
+            if len(encoded) < len(text):
+                text_out = encoded
+
+        if not max_chars or len(text_out) <= max_chars:
+            return text_out
+        head = text_out[:max_chars]
+        # Cut at a line break when there is one reasonably close
+        newline = head.rfind("\n")
+        if newline > max_chars // 2:
+            head = head[:newline]
+        handle = self.store.put(server_name, tool_name, text)
+        self.truncated += 1
+        return (
+            f"{head}\n[truncated: showing {len(head)} of {len(text_out)} characters "
+            f"({text_out.count(chr(10)) + 1} lines); narrow the request to see the rest. "
+            f"full_result_handle={handle}]"
+        )
+
+    def _encode_table(self, text, table, max_chars, server_name, tool_name):
+        columns, rows, extras = table
+        lines = [_csv_line(columns)]
+        used = len(lines[0])
+        shown = 0
+        cut_row = False
+        for row in rows:
+            line = _csv_line(row if isinstance(row, list) else [row])
+            if max_chars and used + len(line) + 1 > max_chars:
+                if shown == 0:
+                    # A single row over the budget: show the start of it rather than nothing
+                    lines.append(line[:max(max_chars - used - 1, 0)])
+                    shown = 1
+                    cut_row = True
+                break
+            lines.append(line)
+            used += len(line) + 1
+            shown += 1
+
+        hint = None
+        if shown < len(rows) and "next_page_token" in extras:
+            # Paged result set: the next page has to start at the first hidden row
+            token = extras["next_page_token"]
+            try:
+                extras["next_page_token"] = rewind_page_token(token, len(rows) - shown) if token else None
+            except (ValueError, KeyError, TypeError):
+                extras["next_page_token"] = token = None
+            if token:
+                hint = "pass next_page_token to continue from the first row not shown"
+            else:
+                hint = f"call again with the same arguments and max_rows={shown} to page through the rest"
+        summary = [f"rows: {len(rows)}"]
+        summary.extend(
+            f"{key}: {json.dumps(value, default=str)}" for key, value in extras.items() if value is not None
+        )
+        if shown < len(rows) or cut_row:
+            handle = self.store.put(server_name, tool_name, text)
+            self.truncated += 1
+            summary[0] = f"showing {shown} of {len(rows)} rows" + (" (the last one cut)" if cut_row else "")
+            summary.append(hint or "narrow the request to see the rest")
+            summary.append(f"full_result_handle={handle}")
+        lines.append(f"[{'; '.join(summary)}]")
+        return "\n".join(lines)
+
+    def stats(self):
+        return {
+            "token_budget": self.token_budget,
+            "compacted": self.compacted,
+            "truncated": self.truncated,
+            "estimated_tokens_in": self.tokens_in,
+            "estimated_tokens_out": self.tokens_out,
+            "store": self.store.stats(),
+        }
@@ -0,0 +1,189 @@
+# tool_selector.py
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from response_cache import cosine_similarity
+from telemetry import TOOL_SCHEMA_TOKENS_SAVED, TOOL_SELECTIONS, timed
+from tool_result_compactor import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# "bm25" ranks tools by keyword overlap with the query, "embedding" by
+# similarity of local Ollama embeddings, "off" always sends every tool
+TOOL_SELECT_MODE = os.getenv("TOOL_SELECT_MODE", "bm25").lower()
+# Tools sent to the model for a query
+TOOL_SELECT_TOP_K = int(os.getenv("TOOL_SELECT_TOP_K", "8"))
+# Smaller catalogs are always sent whole
+TOOL_SELECT_MIN_TOOLS = int(os.getenv("TOOL_SELECT_MIN_TOOLS", "24"))
+# Comma-separated tools sent with every subset
+TOOL_SELECT_ALWAYS = os.getenv("TOOL_SELECT_ALWAYS", "")
+TOOL_SELECT_EMBED_MODEL = os.getenv("TOOL_SELECT_EMBED_MODEL", "nomic-embed-text")
+# Below this similarity no tool counts as relevant and every tool is sent
+TOOL_SELECT_MIN_SIMILARITY = float(os.getenv("TOOL_SELECT_MIN_SIMILARITY", "0.3"))
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "it",
+    "me", "my", "of", "on", "or", "please", "that", "the", "this", "to", "what", "with", "you",
+}
+
+
+def tokenize(text):
+    """Lowercase words of text, with snake_case and camelCase names split and plurals folded"""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text or "")
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return [word[:-1] if len(word) > 3 and word.endswith("s") else word for word in words if word not in STOPWORDS]
+
+
+def tool_document(tool):
+    """Text a tool is indexed by: its name (weighted twice), description and parameters"""
+    schema = convert_to_openai_tool(tool)["function"]
+    parameters = schema.get("parameters", {}).get("properties", {})
+    parts = [tool.name, tool.name, tool.description or ""]
+    for name, spec in parameters.items():
+        parts.extend([name, spec.get("description", "")])
+    return " ".join(parts)
+
+
+def schema_tokens(tool):
+    """Approximate prompt tokens of a tool's schema"""
+    return estimate_tokens(json.dumps(convert_to_openai_tool(tool)))
+
+
+class BM25Index:
+    """Okapi BM25 over a small, fixed set of documents"""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.terms = [Counter(tokenize(document)) for document in documents]
+        self.lengths = [sum(terms.values()) for terms in self.terms]
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        frequencies = Counter(term for terms in self.terms for term in terms)
+        count = len(documents)
+        self.idf = {term: math.log(1 + (count - df + 0.5) / (df + 0.5)) for term, df in frequencies.items()}
+
+    def scores(self, query):
+        words = set(tokenize(query))
+        scores = []
+        for terms, length in zip(self.terms, self.lengths):
+            score = 0.0
+            for word in words:
+                tf = terms.get(word)
+                if tf:
+                    norm = self.k1 * (1 - self.b + self.b * length / self.average_length)
+                    score += self.idf[word] * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+
+class ToolIndex:
+    """Search structures of one catalog version"""
+
+    def __init__(self, fingerprint, tools):
+        self.fingerprint = fingerprint
+        self.names = [tool.name for tool in tools]
+        documents = [tool_document(tool) for tool in tools]
+        self.documents = documents
+        self.bm25 = BM25Index(documents)
+        self.tokens = {tool.name: schema_tokens(tool) for tool in tools}
+        # Filled in on first use in embedding mode
+        self.vectors = None
+
+
+class ToolSelector:
+    """Picks the tools relevant to a query from the catalog.
+
+    Only the top_k best-ranked tools (plus the always-sent ones) are bound to
+    the agent, so each model call carries fewer schemas. When nothing in the
+    catalog matches the query, or the catalog is small, every tool is sent.
+    The index is rebuilt whenever the catalog fingerprint changes.
+    """
+
+    def __init__(self, mode=TOOL_SELECT_MODE, top_k=TOOL_SELECT_TOP_K, min_tools=TOOL_SELECT_MIN_TOOLS,
+                 always=TOOL_SELECT_ALWAYS, min_similarity=TOOL_SELECT_MIN_SIMILARITY, embeddings=None):
+        self.mode = mode
+        self.top_k = top_k
+        self.min_tools = min_tools
+        self.always = {name.strip() for name in always.split(",") if name.strip()}
+        self.min_similarity = min_similarity
+        self._embeddings = embeddings
+        self._index = None
+        self.selections = Counter()
+        self.tokens_saved = 0
+
+    def _get_index(self, fingerprint, tools):
+        if self._index is None or self._index.fingerprint != fingerprint:
+            logger.info("Indexing %d tools for selection", len(tools))
+            self._index = ToolIndex(fingerprint, tools)
+        return self._index
+
+    def _get_embeddings(self):
+        if self._embeddings is None:
+            from langchain_ollama import OllamaEmbeddings
+            self._embeddings = OllamaEmbeddings(model=TOOL_SELECT_EMBED_MODEL)
+        return self._embeddings
+
+    async def _similarities(self, index, query):
+        """Cosine similarity of the query to every tool, or None if embedding failed"""
+        try:
+            if index.vectors is None:
+                index.vectors = await self._get_embeddings().aembed_documents(index.documents)
+            vector = await self._get_embeddings().aembed_query(query)
+        except Exception as e:
+            logger.warning("Error embedding tools for selection, using BM25: %s", e)
+            return None
+        return [
+            score if score >= self.min_similarity else 0.0
+            for score in (cosine_similarity(vector, tool_vector) for tool_vector in index.vectors)
+        ]
+
+    async def rank(self, query, tools, fingerprint):
+        """(name, score) of every tool, best first"""
+        index = self._get_index(fingerprint, tools)
+        scores = None
+        if self.mode == "embedding":
+            scores = await self._similarities(index, query)
+        if scores is None:
+            scores = index.bm25.scores(query)
+        return sorted(zip(index.names, scores), key=lambda item: -item[1])
+
+    async def pick(self, query, tools, fingerprint):
+        """(tools to bind for query in catalog order, outcome, schema tokens saved)"""
+        if self.mode == "off" or len(tools) < self.min_tools or len(tools) <= self.top_k:
+            return tools, "all", 0
+        with timed("tool_select"):
+            ranked = await self.rank(query, tools, fingerprint)
+        picked = {name for name, score in ranked[:self.top_k] if score > 0}
+        if not picked:
+            return tools, "fallback", 0
+        picked |= self.always
+        saved = sum(tokens for name, tokens in self._index.tokens.items() if name not in picked)
+        return [tool for tool in tools if tool.name in picked], "subset", saved
+
+    async def select(self, query, tools, fingerprint):
+        """The tools to bind for query; counts the outcome in the metrics"""
+        subset, outcome, saved = await self.pick(query, tools, fingerprint)
+        self.selections[outcome] += 1
+        self.tokens_saved += saved
+        TOOL_SELECTIONS.labels(mode=self.mode, outcome=outcome).inc()
+        if saved:
+            TOOL_SCHEMA_TOKENS_SAVED.inc(saved)
+        logger.debug("Tool selection %s: %d of %d tools, about %d schema tokens saved",
+                     outcome, len(subset), len(tools), saved)
+        return subset
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "top_k": self.top_k,
+            "min_tools": self.min_tools,
+            "always": sorted(self.always),
+            "selections": dict(self.selections),
+            "schema_tokens_saved": self.tokens_saved,
+        }
@@ -0,0 +1,57 @@
+# warm_up.py
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Spawn the MCP servers, list their tools and build the agent at boot instead
+# of on the first request
+WARM_UP = os.getenv("WARM_UP", "false").lower() in ("1", "true", "yes")
+# Also send the model a short prompt, so a local model is loaded into memory
+WARM_UP_MODEL = os.getenv("WARM_UP_MODEL", "true").lower() in ("1", "true", "yes")
+# Seconds each warm-up step may take
+WARM_UP_TIMEOUT = float(os.getenv("WARM_UP_TIMEOUT", "300"))
+
+
+class WarmUp:
+    """Boot-time warm-up steps and their outcome, for the readiness endpoint.
+
+    Steps run in order on the event loop; a failed step is logged and
+    reported but does not stop the others, since the app can still build
+    what is missing on the first request.
+    """
+
+    def __init__(self, steps, timeout=WARM_UP_TIMEOUT):
+        # (name, coroutine function) pairs
+        self.steps = list(steps)
+        self.timeout = timeout
+        self.started_at = None
+        self.finished_at = None
+        self.results = {}
+
+    @property
+    def ready(self):
+        return self.finished_at is not None
+
+    async def run(self):
+        self.started_at = time.time()
+        for name, step in self.steps:
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(step(), self.timeout)
+                self.results[name] = {"ok": True}
+            except Exception as e:
+                logger.warning("Warm-up step '%s' failed: %s", name, e)
+                self.results[name] = {"ok": False, "error": str(e) or e.__class__.__name__}
+            self.results[name]["seconds"] = round(time.perf_counter() - started, 3)
+        self.finished_at = time.time()
+        logger.info("Warm-up finished in %.3fs", self.finished_at - self.started_at)
+
+    def status(self):
+        return {
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "steps": {name: self.results.get(name, {"pending": True}) for name, _ in self.steps},
+        }
@@ -0,0 +1,43 @@
+# wsgi.py
+"""WSGI entry point: gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app the gunicorn master imports this module once, before
+forking the workers. It loads the heavy libraries there, so the workers
+share them instead of importing them again (only the chat model package
+of the configured provider is loaded), but it does not import
+flask_app: that starts an event loop thread and MCP server processes,
+which must not be created before the fork. Each worker imports flask_app
+right after it starts (see post_worker_init in gunicorn.conf.py).
+"""
+import flask  # noqa: F401
+import langchain_core.messages  # noqa: F401
+import langchain_mcp_adapters.tools  # noqa: F401
+import langgraph.prebuilt  # noqa: F401
+import mcp  # noqa: F401
+from dotenv import load_dotenv
+
+import llm_provider
+
+# MODEL_PROVIDER may come from .env
+load_dotenv()
+llm_provider.chat_model_class(llm_provider.model_config()[0])
+
+
+def load_app():
+    from flask_app import app as flask_app
+    return flask_app
+
+
+class LazyApp:
+    """WSGI callable forwarding to the Flask app of the current worker"""
+
+    def __init__(self):
+        self._app = None
+
+    def __call__(self, environ, start_response):
+        if self._app is None:
+            self._app = load_app()
+        return self._app(environ, start_response)
+
+
+app = LazyApp()